@@ -1,22 +1,60 @@
 """
-Agent caller abstraction. Currently supports real HTTP calls only; if an agent
-is not reachable or misconfigured we return a structured error instead of
-simulating output. This keeps execution transparent for observability and
-alignment with production behavior.
+Agent caller abstraction. Supports real HTTP calls, in-process ASGI apps and
+pooled CLI worker processes; if an agent is not reachable or misconfigured we
+return a structured error instead of simulating output. This keeps execution
+transparent for observability and alignment with production behavior.
 """
 from __future__ import annotations
 
+import asyncio
 import json
-import os
+import logging
+import time
 import uuid
-from typing import Any, Dict
+from typing import Any, Dict, List, Optional
 
 try:
     import httpx  # type: ignore
 except ImportError:
     httpx = None
 
+from .bulkhead import BulkheadRejected, get_bulkhead
+from .cli_pool import CliWorkerError, get_cli_pool
+from .circuit_breaker import TRIPPING_ERROR_TYPES, get_breaker
+from .codec import dumps, loads
+from .deadline import DEADLINE_HEADER, Deadline
+from .http_pool import get_client_pool
+from .latency import get_latency_tracker
 from .models import AgentMetadata, AgentRequest, AgentResponse, ErrorModel, OutputModel
+from .response_cache import cache_key, get_response_cache
+from .single_flight import get_single_flight
+from .upload_store import UploadMissing, get_upload_store
+
+logger = logging.getLogger(__name__)
+
+JSON_HEADERS = {"Content-Type": "application/json"}
+HEALTHCHECK_TIMEOUT_S = 5.0
+NON_ROUND_TRIP_ERRORS = TRIPPING_ERROR_TYPES | {"config_error", "not_implemented"}
+
+
+class AgentTimeout(Exception):
+    """The transport gave up after the agent's effective timeout."""
+
+
+def project_context(context: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Return the handshake context without file payloads. Uploads are described
+    by reference only; the bytes (if any) ride in input.metadata.
+    """
+    file_uploads = context.get("file_uploads")
+    if not file_uploads or not any("base64_data" in fu for fu in file_uploads):
+        return context
+    projected = dict(context)
+    projected["file_uploads"] = [
+        {key: value for key, value in fu.items() if key != "base64_data"}
+        for fu in file_uploads
+    ]
+    return projected
 
 
 async def call_agent(
@@ -25,6 +63,8 @@ async def call_agent(
     text: str,
     context: Dict[str, Any],
     custom_input: Dict[str, Any] = None,
+    deadline: Optional[Deadline] = None,
+    input_data: Optional[Any] = None,
 ) -> AgentResponse:
     """
     Build handshake request and invoke the worker. When endpoints are not real,
@@ -33,155 +73,366 @@ async def call_agent(
     Args:
         custom_input: Optional dict to override default input structure.
                      If provided, it replaces the entire input payload.
+        deadline: Optional request budget; the call is capped at what remains
+                  and returns a `deadline_exceeded` error once it runs out.
+        input_data: Optional structured value chained from a prior step; sent
+                    as input.data next to its JSON text.
     """
 
     request_id = str(uuid.uuid4())
-    
-    # Build metadata with file uploads if available
+
+    # Read-only intents may be answered from the TTL cache. Inputs carrying
+    # files are never cached because the key does not cover file content.
+    cache = get_response_cache()
+    ttl_s = agent_meta.cache_ttl_s.get(intent, 0)
+    cacheable = (
+        ttl_s > 0
+        and custom_input is None
+        and not (agent_meta.accepts_files and context.get("file_uploads"))
+    )
+    key = cache_key(agent_meta.name, intent, text, context.get("user_id"))
+    if cacheable:
+        cached = cache.get(key, request_id)
+        if cached is not None:
+            logger.info(f"Cache hit for {agent_meta.name} ({intent})")
+            return cached
+
+    # Identical concurrent reads share one in-flight call. Known write intents
+    # (those that invalidate cached reads) always go through individually.
+    if custom_input is None and intent not in agent_meta.invalidates:
+        file_digests = tuple(fu.get("digest", "") for fu in context.get("file_uploads") or []) if agent_meta.accepts_files else ()
+        data_key = json.dumps(input_data, sort_keys=True, default=str) if input_data is not None else None
+        flight_key = (agent_meta.name, intent, text, str(context.get("user_id")), file_digests, data_key)
+        response = await get_single_flight().do(
+            flight_key,
+            lambda: _invoke(agent_meta, intent, text, context, request_id, deadline, input_data),
+            request_id,
+        )
+    else:
+        response = await _invoke(agent_meta, intent, text, context, request_id, deadline, input_data)
+    if cacheable:
+        cache.put(key, response, ttl_s)
+    cache.invalidate_for_write(agent_meta, intent)
+    return response
+
+
+async def _invoke(
+    agent_meta: AgentMetadata,
+    intent: str,
+    text: str,
+    context: Dict[str, Any],
+    request_id: str,
+    deadline: Optional[Deadline] = None,
+    input_data: Optional[Any] = None,
+) -> AgentResponse:
+    """Build the handshake and run it through the breaker, timeouts and transport."""
+    # Build metadata with file uploads if available. The file travels at most
+    # once (in input.metadata) and only to agents that read files; context keeps
+    # lightweight references so every agent still sees what was attached.
     metadata: Dict[str, Any] = {"language": "en", "extra": {}}
-    file_uploads = context.get("file_uploads", [])
-    
-    if file_uploads and len(file_uploads) > 0:
-        # For document summarizer agent, send first file as base64 in metadata
-        # Note: Currently supports single file; can be extended for multiple files
-        first_file = file_uploads[0]
-        base64_data = first_file.get("base64_data", "")
+    file_uploads = context.get("file_uploads") or []
+    sent_digests: List[str] = []
+
+    if file_uploads and agent_meta.accepts_files:
+        # Fan-out intents arrive here with one upload per call; every other
+        # intent gets all of them in `files`, the first also in the flat fields
+        # single-file workers read.
+        try:
+            files: List[Dict[str, Any]] = []
+            for upload in file_uploads:
+                attached: Dict[str, Any] = {}
+                digest = _attach_file(agent_meta, upload, attached)
+                if digest:
+                    sent_digests.append(digest)
+                files.append(attached)
+        except UploadMissing as exc:
+            # Calling the agent with a reference it cannot resolve would only
+            # produce a confusing answer about a file it never saw.
+            return _error_response(request_id, agent_meta.name, "upload_missing", str(exc))
+        metadata.update(files[0])
+        if len(files) > 1:
+            metadata["files"] = files
+    elif file_uploads:
+        logger.debug(f"Not forwarding {len(file_uploads)} file(s) to {agent_meta.name}: agent does not accept files")
+
+    agent_input: Dict[str, Any] = {"text": text, "metadata": metadata}
+    if input_data is not None:
+        agent_input["data"] = input_data
+    handshake = AgentRequest(
+        request_id=request_id,
+        agent_name=agent_meta.name,
+        intent=intent,
+        input=agent_input,
+        context=project_context(context),
+    )
+
+    breaker = get_breaker(agent_meta)
+    if not await breaker.allow(lambda: probe_health(agent_meta)):
+        return _error_response(
+            request_id,
+            agent_meta.name,
+            "circuit_open",
+            f"{agent_meta.name} is unavailable after repeated failures; retrying in {breaker.retry_after_s():.0f}s",
+        )
+
+    tracker = get_latency_tracker()
+    timed_out = False
+    try:
+        async with get_bulkhead(agent_meta).slot():
+            # Measure from slot acquisition so queueing does not skew latency.
+            cold = tracker.is_cold(agent_meta.name)
+            timeout_ms = tracker.effective_timeout_ms(agent_meta, intent, cold)
+            budget_ms = deadline.step_budget_ms() if deadline is not None else timeout_ms
+            if budget_ms <= 0:
+                raise asyncio.TimeoutError
+            started = time.perf_counter()
+            call = _dispatch(agent_meta, handshake, text, timeout_ms, min(timeout_ms, budget_ms))
+            try:
+                if budget_ms < timeout_ms:
+                    # The request budget, not the agent, is the binding limit; keep
+                    # the two apart so running out of budget never trips the breaker.
+                    response = await asyncio.wait_for(call, timeout=budget_ms / 1000)
+                else:
+                    response = await call
+            except AgentTimeout as exc:
+                timed_out = True
+                response = _error_response(request_id, agent_meta.name, "network_error", str(exc))
+    except BulkheadRejected as exc:
+        breaker.abort_trial()
+        return _error_response(request_id, agent_meta.name, f"bulkhead_{exc.reason}", str(exc))
+    except asyncio.TimeoutError:
+        breaker.abort_trial()
+        return deadline_exceeded_response(request_id, agent_meta.name)
+    except BaseException:
+        breaker.abort_trial()
+        raise
+    breaker.record(response)
+    # Only real round trips feed the histogram as measured; a timeout is kept
+    # as a lower bound so a slowing agent widens its own timeout, and local
+    # config errors are left out so they do not drag it towards zero.
+    if timed_out:
+        tracker.record_timeout(agent_meta.name, intent, timeout_ms, cold)
+    elif not (response.error and response.error.type in NON_ROUND_TRIP_ERRORS):
+        tracker.record(agent_meta.name, intent, (time.perf_counter() - started) * 1000, cold)
+
+    if response.status == "success":
+        for digest in sent_digests:
+            get_upload_store().mark_delivered(agent_meta.name, digest)
+    return response
+
+
+def _attach_file(agent_meta: AgentMetadata, upload: Dict[str, Any], metadata: Dict[str, Any]) -> Optional[str]:
+    """
+    Place one upload into a handshake file entry.
+
+    Store-backed uploads always add a `file_ref` (digest, filename, mime_type,
+    size); the base64 bytes are skipped when the agent understands references
+    and already holds that digest. Returns the digest whose bytes were sent.
+
+    Raises:
+        UploadMissing: If the bytes are needed but no longer in the store.
+    """
+    metadata["mime_type"] = upload.get("mime_type", "application/octet-stream")
+    metadata["filename"] = upload.get("filename", "uploaded_file")
+
+    digest = upload.get("digest")
+    if not digest:
+        # Legacy shape: raw base64 carried in the context itself.
+        base64_data = upload.get("base64_data", "")
         if base64_data:  # Only add if not empty
             metadata["file_base64"] = base64_data
-            metadata["mime_type"] = first_file.get("mime_type", "application/octet-stream")
-            metadata["filename"] = first_file.get("filename", "uploaded_file")
-            # Debug logging
-            import logging
-            logger = logging.getLogger(__name__)
-            logger.info(f"Sending file to {agent_meta.name}: {first_file.get('filename', 'unknown')} ({len(base64_data)} chars base64)")
+            logger.info(f"Sending file to {agent_meta.name}: {metadata['filename']} ({len(base64_data)} chars base64)")
         else:
-            import logging
-            logger = logging.getLogger(__name__)
             logger.warning(f"File upload found but base64_data is empty for {agent_meta.name}")
-    else:
-        import logging
-        logger = logging.getLogger(__name__)
-        logger.debug(f"No file uploads in context for {agent_meta.name}")
-    
-    handshake = AgentRequest(
+        return None
+
+    store = get_upload_store()
+    metadata["file_ref"] = {key: upload.get(key) for key in ("digest", "filename", "mime_type", "size")}
+    if agent_meta.supports_file_refs and store.was_delivered(agent_meta.name, digest):
+        logger.info(f"Sending file reference to {agent_meta.name}: {metadata['filename']} ({digest[:19]})")
+        return None
+
+    entry = store.get(digest)
+    if entry is None:
+        raise UploadMissing(f"Upload {metadata['filename']} ({digest[:19]}) is no longer available; please upload it again")
+    metadata["file_base64"] = entry.base64()
+    logger.info(f"Sending file to {agent_meta.name}: {entry.filename} ({entry.size} bytes)")
+    return digest
+
+
+async def _client_for(agent_meta: AgentMetadata, url: str):
+    """Pooled client for the agent: in-memory ASGI for inproc agents, per-host HTTP otherwise."""
+    pool = get_client_pool()
+    if agent_meta.type == "inproc":
+        return await pool.client_for_app(agent_meta.asgi_app)
+    return pool.client_for(url)
+
+
+async def probe_health(agent_meta: AgentMetadata) -> bool:
+    """GET the registry healthcheck; agents without one are assumed healthy."""
+    if not agent_meta.healthcheck or httpx is None:
+        return True
+    try:
+        client = await _client_for(agent_meta, agent_meta.healthcheck)
+        resp = await client.get(agent_meta.healthcheck, timeout=HEALTHCHECK_TIMEOUT_S)
+        return resp.status_code < 500
+    except Exception as exc:
+        logger.info(f"Healthcheck for {agent_meta.name} failed: {exc}")
+        return False
+
+
+def _error_response(request_id: str, agent_name: str, error_type: str, message: str) -> AgentResponse:
+    return AgentResponse(
         request_id=request_id,
-        agent_name=agent_meta.name,
-        intent=intent,
-        input={"text": text, "metadata": metadata},
-        context=context,
+        agent_name=agent_name,
+        status="error",
+        error=ErrorModel(type=error_type, message=message),
+    )
+
+
+def deadline_exceeded_response(request_id: str, agent_name: str) -> AgentResponse:
+    return _error_response(
+        request_id,
+        agent_name,
+        "deadline_exceeded",
+        f"Request time budget ran out before {agent_name} could finish",
     )
 
+
+async def _dispatch(
+    agent_meta: AgentMetadata,
+    handshake: AgentRequest,
+    text: str,
+    timeout_ms: int,
+    deadline_ms: Optional[int] = None,
+) -> AgentResponse:
+    """Route the handshake to the transport configured for the agent."""
+    request_id = handshake.request_id
+
     # Only live HTTP calls are supported; no simulation fallback.
     if agent_meta.type == "http" and agent_meta.endpoint and httpx is not None:
+        return await _call_http(agent_meta, handshake, text, timeout_ms, deadline_ms)
+    elif agent_meta.type == "inproc" and agent_meta.asgi_app and agent_meta.endpoint and httpx is not None:
+        # Same handshake and reply handling as HTTP, minus the loopback socket.
+        # httpx does not enforce timeouts on ASGITransport, so apply it here.
         try:
-            import logging
-            logger = logging.getLogger(__name__)
+            return await asyncio.wait_for(
+                _call_http(agent_meta, handshake, text, timeout_ms, deadline_ms), timeout=timeout_ms / 1000
+            )
+        except asyncio.TimeoutError:
+            raise AgentTimeout(f"Timed out after {timeout_ms} ms waiting for in-process {agent_meta.name}")
+    elif agent_meta.type in {"http", "inproc"} and httpx is None:
+        return _error_response(request_id, agent_meta.name, "config_error", "httpx not installed for HTTP agent calls")
+    elif agent_meta.type == "cli" and agent_meta.command:
+        return await _call_cli(agent_meta, handshake, timeout_ms)
+    else:
+        return _error_response(request_id, agent_meta.name, "config_error", "Agent endpoint/command not configured")
+
+
+async def _call_http(
+    agent_meta: AgentMetadata,
+    handshake: AgentRequest,
+    text: str,
+    timeout_ms: int,
+    deadline_ms: Optional[int] = None,
+) -> AgentResponse:
+    """POST the handshake over the pooled HTTP client and normalise the reply."""
+    request_id = handshake.request_id
+    try:
+        client = await _client_for(agent_meta, agent_meta.endpoint)
+    except (ImportError, AttributeError, ValueError) as exc:
+        # Only reachable for inproc agents whose asgi_app path does not resolve.
+        return _error_response(request_id, agent_meta.name, "config_error", f"Cannot load {agent_meta.asgi_app}: {exc}")
+    try:
+        # Special handling for budget_tracker_agent - it expects {"query": "..."} format
+        if agent_meta.name == "budget_tracker_agent":
+            payload = {"query": text}
+            logger.info(f"Calling {agent_meta.name} with payload: {payload}")
+        else:
+            payload = handshake.model_dump()
+        
+        resp = await client.post(
+            agent_meta.endpoint,
+            content=dumps(payload),
+            # Tell the worker how long the supervisor will wait for it.
+            headers={**JSON_HEADERS, DEADLINE_HEADER: str(deadline_ms or timeout_ms)},
+            timeout=timeout_ms / 1000,
+        )
+        logger.info(f"{agent_meta.name} response status: {resp.status_code}")
+        if resp.status_code != 200:
+            return _error_response(
+                request_id,
+                agent_meta.name,
+                "http_error",
+                f"HTTP {resp.status_code} calling {agent_meta.endpoint}",
+            )
+        
+        # Special handling for budget_tracker_agent response format
+        if agent_meta.name == "budget_tracker_agent":
+            return _parse_budget_tracker_response(request_id, agent_meta, resp)
+        # Validate straight from the raw bytes; no intermediate dict.
+        return AgentResponse.model_validate_json(resp.content)
+    except httpx.TimeoutException:
+        raise AgentTimeout(f"Timed out after {timeout_ms} ms calling {agent_meta.endpoint}")
+    except Exception as exc:
+        return _error_response(request_id, agent_meta.name, "network_error", str(exc))
+
+
+async def _call_cli(agent_meta: AgentMetadata, handshake: AgentRequest, timeout_ms: int) -> AgentResponse:
+    """Exchange the handshake as one JSON line with a pooled worker process."""
+    request_id = handshake.request_id
+    try:
+        reply = await get_cli_pool(agent_meta).call(dumps(handshake.model_dump()), timeout_ms / 1000)
+    except asyncio.TimeoutError:
+        raise AgentTimeout(f"Timed out after {timeout_ms} ms waiting for {agent_meta.name} worker")
+    except (CliWorkerError, OSError, ValueError) as exc:
+        return _error_response(request_id, agent_meta.name, "network_error", str(exc))
+    try:
+        return AgentResponse.model_validate_json(reply)
+    except Exception as exc:
+        logger.error(f"Invalid reply from {agent_meta.name} worker: {exc}, raw: {reply[:500]!r}")
+        return _error_response(request_id, agent_meta.name, "parse_error", f"Failed to parse agent response: {exc}")
+
+
+def _parse_budget_tracker_response(request_id: str, agent_meta: AgentMetadata, resp: Any) -> AgentResponse:
+    """Convert budget tracker's native reply into the supervisor handshake format."""
+    try:
+        resp_data = loads(resp.content)
+        if resp_data.get("success", False):
+            # Extract the response text or format the data
+            result_text = resp_data.get("response")
+            if not result_text:
+                # If no "response" field, format the key data into a readable string
+                parts = []
+                if "remaining" in resp_data:
+                    parts.append(f"Remaining: ${resp_data['remaining']:.2f}")
+                if "project_name" in resp_data:
+                    parts.append(f"Project: {resp_data['project_name']}")
+                if "overshoot_risk" in resp_data:
+                    parts.append(f"Overshoot Risk: {resp_data['overshoot_risk']}")
+                if "recommendations" in resp_data and resp_data["recommendations"]:
+                    parts.append(f"Recommendations: {', '.join(resp_data['recommendations'])}")
+                result_text = ". ".join(parts) if parts else str(resp_data)
             
-            async with httpx.AsyncClient(timeout=agent_meta.timeout_ms / 1000) as client:
-                # Special handling for budget_tracker_agent - it expects {"query": "..."} format
-                if agent_meta.name == "budget_tracker_agent":
-                    payload = {"query": text}
-                    logger.info(f"Calling {agent_meta.name} with payload: {payload}")
-                else:
-                    payload = handshake.dict()
-                
-                resp = await client.post(agent_meta.endpoint, json=payload)
-                logger.info(f"{agent_meta.name} response status: {resp.status_code}")
-                if resp.status_code != 200:
-                    return AgentResponse(
-                        request_id=request_id,
-                        agent_name=agent_meta.name,
-                        status="error",
-                        error=ErrorModel(
-                            type="http_error",
-                            message=f"HTTP {resp.status_code} calling {agent_meta.endpoint}",
-                        ),
-                    )
-                
-                # Special handling for budget_tracker_agent response format
-                if agent_meta.name == "budget_tracker_agent":
-                    try:
-                        resp_data = resp.json()
-                        # Convert budget tracker response to supervisor handshake format
-                        if resp_data.get("success", False):
-                            # Extract the response text or format the data
-                            result_text = resp_data.get("response")
-                            if not result_text:
-                                # If no "response" field, format the key data into a readable string
-                                parts = []
-                                if "remaining" in resp_data:
-                                    parts.append(f"Remaining: ${resp_data['remaining']:.2f}")
-                                if "project_name" in resp_data:
-                                    parts.append(f"Project: {resp_data['project_name']}")
-                                if "overshoot_risk" in resp_data:
-                                    parts.append(f"Overshoot Risk: {resp_data['overshoot_risk']}")
-                                if "recommendations" in resp_data and resp_data["recommendations"]:
-                                    parts.append(f"Recommendations: {', '.join(resp_data['recommendations'])}")
-                                result_text = ". ".join(parts) if parts else str(resp_data)
-                            
-                            return AgentResponse(
-                                request_id=request_id,
-                                agent_name=agent_meta.name,
-                                status="success",
-                                output=OutputModel(
-                                    result=result_text,
-                                    details=json.dumps(resp_data, indent=2) if resp_data else None,
-                                ),
-                                error=None,
-                            )
-                        else:
-                            # Budget tracker returned success=false or error
-                            error_msg = resp_data.get("error", resp_data.get("message", "Unknown error from budget tracker agent"))
-                            return AgentResponse(
-                                request_id=request_id,
-                                agent_name=agent_meta.name,
-                                status="error",
-                                error=ErrorModel(
-                                    type="agent_error",
-                                    message=str(error_msg),
-                                ),
-                            )
-                    except Exception as parse_exc:
-                        # If JSON parsing fails, try to return the raw response
-                        import logging
-                        logger = logging.getLogger(__name__)
-                        logger.error(f"Failed to parse budget_tracker_agent response: {parse_exc}, raw: {resp.text[:500]}")
-                        return AgentResponse(
-                            request_id=request_id,
-                            agent_name=agent_meta.name,
-                            status="error",
-                            error=ErrorModel(
-                                type="parse_error",
-                                message=f"Failed to parse agent response: {str(parse_exc)}",
-                            ),
-                        )
-                else:
-                    return AgentResponse(**resp.json())
-        except Exception as exc:
             return AgentResponse(
                 request_id=request_id,
                 agent_name=agent_meta.name,
-                status="error",
-                error=ErrorModel(type="network_error", message=str(exc)),
+                status="success",
+                output=OutputModel(
+                    result=result_text,
+                    details=json.dumps(resp_data, indent=2) if resp_data else None,
+                ),
+                error=None,
             )
-    elif agent_meta.type == "http" and httpx is None:
-        return AgentResponse(
-            request_id=request_id,
-            agent_name=agent_meta.name,
-            status="error",
-            error=ErrorModel(type="config_error", message="httpx not installed for HTTP agent calls"),
-        )
-    elif agent_meta.type == "cli":
-        return AgentResponse(
-            request_id=request_id,
-            agent_name=agent_meta.name,
-            status="error",
-            error=ErrorModel(type="not_implemented", message="CLI agent execution is not implemented"),
-        )
-    else:
-        return AgentResponse(
-            request_id=request_id,
-            agent_name=agent_meta.name,
-            status="error",
-            error=ErrorModel(type="config_error", message="Agent endpoint/command not configured"),
+        # Budget tracker returned success=false or error
+        error_msg = resp_data.get("error", resp_data.get("message", "Unknown error from budget tracker agent"))
+        return _error_response(request_id, agent_meta.name, "agent_error", str(error_msg))
+    except Exception as parse_exc:
+        # If JSON parsing fails, try to return the raw response
+        logger.error(f"Failed to parse budget_tracker_agent response: {parse_exc}, raw: {resp.text[:500]}")
+        return _error_response(
+            request_id,
+            agent_meta.name,
+            "parse_error",
+            f"Failed to parse agent response: {str(parse_exc)}",
         )
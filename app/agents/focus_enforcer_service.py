@@ -73,6 +73,7 @@ class InputMetadata(BaseModel):
 
 class AgentInput(BaseModel):
     text: str
+    data: Optional[Any] = None  # structured value chained from a prior step, when available
     metadata: InputMetadata = Field(default_factory=InputMetadata)
 
 
@@ -476,16 +477,17 @@ def get_fallback_analysis(reason: str, activity_history: List[Dict[str, Any]]) -
 # INTENT HANDLERS
 # =============================================================================
 
-def parse_deadline_data_from_input(text: str) -> Dict[str, Any]:
+def parse_deadline_data_from_input(text: str, data: Optional[Any] = None) -> Dict[str, Any]:
     """Parse deadline data that came from Deadline Guardian via Supervisor."""
     try:
-        data = json.loads(text)
+        if not isinstance(data, dict):
+            data = json.loads(text)
         return {
             "critical_deadline": data.get("next_deadline", data.get("critical_deadline", "TBD")),
             "deadline_risk": data.get("risk_level", data.get("deadline_risk", "unknown")),
             "deadlines": data.get("deadlines", [])
         }
-    except (json.JSONDecodeError, TypeError):
+    except (json.JSONDecodeError, TypeError, AttributeError):
         return {
             "critical_deadline": text if text else "TBD",
             "deadline_risk": "unknown",
@@ -506,7 +508,7 @@ async def handle_start_monitoring(request: SupervisorRequest) -> SupervisorRespo
             )
         )
     
-    dg_data = parse_deadline_data_from_input(request.input.text)
+    dg_data = parse_deadline_data_from_input(request.input.text, request.input.data)
     state.dg_data = dg_data
     
     extra = request.input.metadata.extra
@@ -583,7 +585,7 @@ async def handle_stop_monitoring(request: SupervisorRequest) -> SupervisorRespon
 
 async def handle_analyze_focus(request: SupervisorRequest) -> SupervisorResponse:
     """Analyze current focus state with deadline context from Supervisor."""
-    dg_data = parse_deadline_data_from_input(request.input.text)
+    dg_data = parse_deadline_data_from_input(request.input.text, request.input.data)
     
     analysis = await analyze_focus({
         "paa_data": state.paa_data,
@@ -5,21 +5,18 @@ Falls back to deterministic stitching when OpenRouter is unavailable.
 from __future__ import annotations
 
 import json
-import os
 from typing import Dict, List, Optional
 
-try:
-    from openai import OpenAI  # type: ignore
-except ImportError:
-    OpenAI = None
-
+from .llm_client import OPENROUTER_MODEL, get_openrouter_client
 from .models import AgentResponse
 
 
-OPENROUTER_MODEL = os.getenv("OPENROUTER_MODEL", "google/gemini-2.5-flash-lite")
-
-
-def compose_final_answer(query: str, step_outputs: Dict[int, AgentResponse], history: Optional[List] = None) -> str:
+async def compose_final_answer(
+    query: str,
+    step_outputs: Dict[int, AgentResponse],
+    history: Optional[List] = None,
+    timeout_s: Optional[float] = None,
+) -> str:
     """Convert tool outputs into a concise answer."""
     # If no steps were executed, treat as out-of-scope.
     if not step_outputs:
@@ -34,6 +31,8 @@ def compose_final_answer(query: str, step_outputs: Dict[int, AgentResponse], his
 
     # For document reviewer agent, convert JSON to formatted markdown
     for s in successful:
+        if s.agent_name == "document_reviewer_agent" and s.output and _is_fan_out(s):
+            return format_file_reviews_as_markdown(s.output.details["files"])
         if s.agent_name == "document_reviewer_agent" and s.output:
             try:
                 review_data = json.loads(str(s.output.result))
@@ -42,17 +41,10 @@ def compose_final_answer(query: str, step_outputs: Dict[int, AgentResponse], his
             except (json.JSONDecodeError, AttributeError):
                 pass  # Fall through to default handling.
 
-    api_key = os.getenv("OPENROUTER_API_KEY")
-    if OpenAI is None or not api_key:
+    client = get_openrouter_client()
+    if client is None:
         return stitched  # Return markdown directly without prefix
 
-    try:
-        client = OpenAI(
-            base_url="https://openrouter.ai/api/v1",
-            api_key=api_key,
-        )
-    except Exception:
-        return f"Based on the tools, here is what I found: {stitched}"
     tool_findings = [
         {
             "agent": s.agent_name,
@@ -73,18 +65,45 @@ def compose_final_answer(query: str, step_outputs: Dict[int, AgentResponse], his
     user_prompt = json.dumps(user_payload, indent=2)
 
     try:
-        response = client.chat.completions.create(
+        response = await client.chat.completions.create(
             model=OPENROUTER_MODEL,
             messages=[
                 {"role": "system", "content": system_prompt},
                 {"role": "user", "content": user_prompt},
             ],
+            # Passing timeout=None would disable the SDK default, so only set it when budgeted.
+            **({"timeout": timeout_s} if timeout_s is not None else {}),
         )
         return response.choices[0].message.content.strip() if response.choices else stitched
     except Exception:
         return stitched
     
 
+def _is_fan_out(response: AgentResponse) -> bool:
+    """True for a step output merged from one call per uploaded file."""
+    details = response.output.details if response.output else None
+    return isinstance(details, dict) and isinstance(details.get("files"), list)
+
+
+def format_file_reviews_as_markdown(files: List[Dict]) -> str:
+    """Render one review section per file of a fanned-out document review."""
+    sections = []
+    for entry in files:
+        filename = entry.get("filename", "uploaded_file")
+        output = entry.get("output") or {}
+        if entry.get("status") != "success":
+            message = (entry.get("error") or {}).get("message", "review failed")
+            sections.append(f"# {filename}\n\nReview failed: {message}")
+            continue
+        try:
+            result = output.get("result")
+            review_data = result if isinstance(result, dict) else json.loads(str(result))
+            sections.append(f"# {filename}\n\n{format_review_as_markdown(review_data)}")
+        except (json.JSONDecodeError, AttributeError):
+            sections.append(f"# {filename}\n\n{output.get('result')}")
+    return "\n\n".join(sections)
+
+
 def format_review_as_markdown(review_data: Dict) -> str:
     """Convert document review JSON to formatted markdown."""
     md = []
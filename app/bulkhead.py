@@ -0,0 +1,98 @@
+"""
+Per-agent bulkheads. Each agent gets a semaphore capping its concurrent
+outbound calls plus a bounded wait queue with a queue timeout, so a stalled
+worker can only tie up its own slots instead of every in-flight request.
+Limits come from the registry (`max_concurrency`, `max_queue`,
+`queue_timeout_ms`).
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict
+
+from .latency import LatencyWindow
+from .models import AgentMetadata
+
+
+class BulkheadRejected(Exception):
+    """Raised when a call cannot get a slot; `reason` is 'queue_full' or 'queue_timeout'."""
+
+    def __init__(self, reason: str, message: str) -> None:
+        super().__init__(message)
+        self.reason = reason
+
+
+class Bulkhead:
+    def __init__(self, name: str, max_concurrency: int, max_queue: int, queue_timeout_s: float) -> None:
+        self.name = name
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queue = max(0, max_queue)
+        self.queue_timeout_s = queue_timeout_s
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self.active = 0
+        self.waiting = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.wait_ms = LatencyWindow()
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        if self._semaphore.locked() and self.waiting >= self.max_queue:
+            self.rejected += 1
+            raise BulkheadRejected(
+                "queue_full",
+                f"{self.name} has {self.active} calls in flight and {self.waiting} queued",
+            )
+        started = time.perf_counter()
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout_s)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise BulkheadRejected(
+                "queue_timeout",
+                f"Waited {self.queue_timeout_s:.1f}s for a free {self.name} slot",
+            ) from None
+        finally:
+            self.waiting -= 1
+        self.wait_ms.add((time.perf_counter() - started) * 1000)
+        self.active += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self._semaphore.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "active": self.active,
+            "waiting": self.waiting,
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+            "wait": self.wait_ms.summary(),
+        }
+
+
+_BULKHEADS: Dict[str, Bulkhead] = {}
+
+
+def get_bulkhead(agent_meta: AgentMetadata) -> Bulkhead:
+    """Return the bulkhead for an agent, creating it on first use."""
+    bulkhead = _BULKHEADS.get(agent_meta.name)
+    if bulkhead is None:
+        bulkhead = Bulkhead(
+            agent_meta.name,
+            max_concurrency=agent_meta.max_concurrency,
+            max_queue=agent_meta.max_queue,
+            queue_timeout_s=agent_meta.queue_timeout_ms / 1000,
+        )
+        _BULKHEADS[agent_meta.name] = bulkhead
+    return bulkhead
+
+
+def bulkhead_stats() -> Dict[str, Dict[str, Any]]:
+    return {name: bulkhead.stats() for name, bulkhead in _BULKHEADS.items()}
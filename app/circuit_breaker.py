@@ -0,0 +1,142 @@
+"""
+Per-agent circuit breakers. After a run of consecutive transport failures
+(network_error/http_error) the breaker opens and calls fail fast instead of
+waiting out the agent's full timeout. Once the reset window passes the breaker
+goes half-open: a single caller probes the registry healthcheck and, if the
+worker answers, its real call is let through as the trial. Success closes the
+breaker; failure re-opens it for another window.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from .models import AgentMetadata, AgentResponse
+
+logger = logging.getLogger(__name__)
+
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("SUPERVISOR_BREAKER_FAILURES", "3"))
+BREAKER_RESET_S = float(os.getenv("SUPERVISOR_BREAKER_RESET_S", "30"))
+
+# Only transport-level failures count against a worker's health; agent_error,
+# parse_error and friends mean the worker is up and answering.
+TRIPPING_ERROR_TYPES = {"network_error", "http_error"}
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker with a single half-open trial."""
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+        reset_timeout_s: float = BREAKER_RESET_S,
+    ) -> None:
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout_s = reset_timeout_s
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self.consecutive_failures = 0
+        self.rejected = 0
+        self.last_error: Optional[str] = None
+
+    @property
+    def state(self) -> str:
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.reset_timeout_s:
+            return HALF_OPEN
+        return self._state
+
+    def retry_after_s(self) -> float:
+        if self._state != OPEN:
+            return 0.0
+        return max(0.0, self.reset_timeout_s - (time.monotonic() - self._opened_at))
+
+    async def allow(self, probe: Optional[Callable[[], Awaitable[bool]]] = None) -> bool:
+        """Return True if a call may proceed; runs the healthcheck probe when half-open."""
+        state = self.state
+        if state == CLOSED:
+            return True
+        if state == OPEN or self._trial_in_flight:
+            self.rejected += 1
+            return False
+
+        # Half-open: this caller owns the trial.
+        self._trial_in_flight = True
+        self._state = HALF_OPEN
+        healthy = True
+        if probe is not None:
+            try:
+                healthy = await probe()
+            except Exception as exc:
+                healthy = False
+                self.last_error = f"healthcheck failed: {exc}"
+            except BaseException:
+                # Cancelled mid-probe (deadline, disconnect, abandoned single
+                # flight): hand the trial to the next caller instead of holding it.
+                self.abort_trial()
+                raise
+        if not healthy:
+            logger.warning("Circuit %s: healthcheck probe failed, staying open", self.name)
+            self._open()
+            self.rejected += 1
+            return False
+        logger.info("Circuit %s: healthcheck passed, sending trial call", self.name)
+        return True
+
+    def record(self, response: AgentResponse) -> None:
+        """Update breaker state from a completed call."""
+        error_type = response.error.type if response.error else None
+        if response.status == "error" and error_type in TRIPPING_ERROR_TYPES:
+            self.consecutive_failures += 1
+            self.last_error = response.error.message if response.error else None
+            if self._state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                self._open()
+            return
+        if self._state != CLOSED:
+            logger.info("Circuit %s: closed after successful trial", self.name)
+        self._state = CLOSED
+        self._trial_in_flight = False
+        self.consecutive_failures = 0
+
+    def abort_trial(self) -> None:
+        """Release the half-open trial slot when the trial call never completed."""
+        self._trial_in_flight = False
+
+    def _open(self) -> None:
+        if self._state != OPEN:
+            logger.warning(
+                "Circuit %s: opened after %d consecutive failure(s)", self.name, self.consecutive_failures
+            )
+        self._state = OPEN
+        self._opened_at = time.monotonic()
+        self._trial_in_flight = False
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "failure_threshold": self.failure_threshold,
+            "retry_after_s": round(self.retry_after_s(), 1),
+            "rejected": self.rejected,
+            "last_error": self.last_error,
+        }
+
+
+_BREAKERS: Dict[str, CircuitBreaker] = {}
+
+
+def get_breaker(agent_meta: AgentMetadata) -> CircuitBreaker:
+    """Return the breaker for an agent, creating it on first use."""
+    breaker = _BREAKERS.get(agent_meta.name)
+    if breaker is None:
+        breaker = CircuitBreaker(agent_meta.name)
+        _BREAKERS[agent_meta.name] = breaker
+    return breaker
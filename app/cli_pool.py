@@ -0,0 +1,156 @@
+"""
+Persistent worker processes for `type="cli"` agents. Each CLI agent gets a
+bounded pool of long-lived subprocesses started from its registry `command`.
+The handshake is exchanged as JSON lines: the supervisor writes one AgentRequest
+per line to the worker's stdin and reads one AgentResponse line back from its
+stdout. Workers serve one request at a time, are spawned lazily, and are
+replaced whenever they crash, time out or are interrupted mid-request, so a
+call never pays for a process spawn unless the previous worker died.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import shlex
+from typing import Any, Dict, Optional
+
+from .models import AgentMetadata
+
+logger = logging.getLogger(__name__)
+
+# StreamReader line limit; handshakes may carry base64 uploads.
+CLI_MAX_LINE_BYTES = int(os.getenv("SUPERVISOR_CLI_MAX_LINE_BYTES", str(64 * 1024 * 1024)))
+CLI_SHUTDOWN_GRACE_S = 2.0
+
+
+class CliWorkerError(Exception):
+    """The worker process exited or produced no reply."""
+
+
+class CliWorker:
+    def __init__(self, name: str, proc: asyncio.subprocess.Process) -> None:
+        self.name = name
+        self.proc = proc
+        self.broken = False
+
+    @classmethod
+    async def spawn(cls, name: str, command: str) -> "CliWorker":
+        proc = await asyncio.create_subprocess_exec(
+            *shlex.split(command),
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            limit=CLI_MAX_LINE_BYTES,
+        )
+        logger.info("Started CLI worker for %s (pid %s)", name, proc.pid)
+        return cls(name, proc)
+
+    @property
+    def alive(self) -> bool:
+        # returncode is only set once the child is reaped, so track kills too.
+        return not self.broken and self.proc.returncode is None
+
+    async def request(self, line: bytes, timeout_s: float) -> bytes:
+        if not self.alive:
+            raise CliWorkerError(f"{self.name} worker exited with code {self.proc.returncode}")
+        try:
+            self.proc.stdin.write(line + b"\n")
+            await self.proc.stdin.drain()
+        except (BrokenPipeError, ConnectionResetError) as exc:
+            raise CliWorkerError(f"{self.name} worker closed stdin: {exc}") from exc
+        reply = await asyncio.wait_for(self.proc.stdout.readline(), timeout=timeout_s)
+        if not reply:
+            raise CliWorkerError(f"{self.name} worker exited without replying")
+        return reply
+
+    def kill(self) -> None:
+        if self.alive:
+            self.broken = True
+            try:
+                self.proc.kill()
+            except ProcessLookupError:
+                pass
+
+    async def stop(self) -> None:
+        if not self.alive:
+            return
+        try:
+            self.proc.stdin.close()
+            await asyncio.wait_for(self.proc.wait(), timeout=CLI_SHUTDOWN_GRACE_S)
+        except (asyncio.TimeoutError, Exception):
+            self.kill()
+            await self.proc.wait()
+
+
+class CliWorkerPool:
+    """Up to `size` workers; a free-slot queue holds idle workers (or None for unspawned slots)."""
+
+    def __init__(self, name: str, command: str, size: int) -> None:
+        self.name = name
+        self.command = command
+        self.size = max(1, size)
+        self._slots: "asyncio.Queue[Optional[CliWorker]]" = asyncio.Queue()
+        for _ in range(self.size):
+            self._slots.put_nowait(None)
+        self._workers: Dict[int, CliWorker] = {}
+        self.spawned = 0
+        self.restarts = 0
+        self.requests = 0
+
+    async def call(self, line: bytes, timeout_s: float) -> bytes:
+        worker = await self._slots.get()
+        try:
+            if worker is None or not worker.alive:
+                if worker is not None:
+                    self.restarts += 1
+                    self._workers.pop(worker.proc.pid, None)
+                    logger.warning("CLI worker for %s died (code %s); restarting", self.name, worker.proc.returncode)
+                worker = await CliWorker.spawn(self.name, self.command)
+                self._workers[worker.proc.pid] = worker
+                self.spawned += 1
+            self.requests += 1
+            return await worker.request(line, timeout_s)
+        except BaseException:
+            # Timeout, crash or cancellation: the worker may still emit a stale
+            # reply, so it must not serve another request.
+            if worker is not None:
+                worker.kill()
+            raise
+        finally:
+            self._slots.put_nowait(worker)
+
+    async def aclose(self) -> None:
+        workers, self._workers = list(self._workers.values()), {}
+        await asyncio.gather(*(w.stop() for w in workers), return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "size": self.size,
+            "alive": sum(1 for w in self._workers.values() if w.alive),
+            "idle": self._slots.qsize(),
+            "spawned": self.spawned,
+            "restarts": self.restarts,
+            "requests": self.requests,
+        }
+
+
+_POOLS: Dict[str, CliWorkerPool] = {}
+
+
+def get_cli_pool(agent_meta: AgentMetadata) -> CliWorkerPool:
+    """Return the worker pool for a CLI agent, creating it on first use."""
+    pool = _POOLS.get(agent_meta.name)
+    if pool is None:
+        pool = CliWorkerPool(agent_meta.name, agent_meta.command, agent_meta.cli_workers)
+        _POOLS[agent_meta.name] = pool
+    return pool
+
+
+async def close_cli_pools() -> None:
+    pools = list(_POOLS.values())
+    _POOLS.clear()
+    await asyncio.gather(*(pool.aclose() for pool in pools), return_exceptions=True)
+
+
+def cli_pool_stats() -> Dict[str, Dict[str, Any]]:
+    return {name: pool.stats() for name, pool in _POOLS.items()}
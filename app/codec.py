@@ -0,0 +1,83 @@
+"""
+JSON codec used on the hot serialization paths (agent handshakes and API
+responses). Prefers orjson, then msgspec, and falls back to the stdlib so the
+app runs without either installed. Force a backend with SUPERVISOR_JSON_CODEC.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+from typing import Any, Callable, Tuple
+
+from fastapi.responses import JSONResponse
+
+logger = logging.getLogger(__name__)
+
+
+def _orjson_codec() -> Tuple[Callable[[Any], bytes], Callable[[Any], Any]]:
+    import orjson  # type: ignore
+
+    options = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+    def dumps(obj: Any) -> bytes:
+        return orjson.dumps(obj, default=str, option=options)
+
+    return dumps, orjson.loads
+
+
+def _msgspec_codec() -> Tuple[Callable[[Any], bytes], Callable[[Any], Any]]:
+    import msgspec  # type: ignore
+
+    encoder = msgspec.json.Encoder(enc_hook=str)
+    decoder = msgspec.json.Decoder()
+    return encoder.encode, decoder.decode
+
+
+def _stdlib_codec() -> Tuple[Callable[[Any], bytes], Callable[[Any], Any]]:
+    def dumps(obj: Any) -> bytes:
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+
+    return dumps, json.loads
+
+
+_BACKENDS = {
+    "orjson": _orjson_codec,
+    "msgspec": _msgspec_codec,
+    "json": _stdlib_codec,
+}
+
+
+def _select_backend() -> Tuple[str, Callable[[Any], bytes], Callable[[Any], Any]]:
+    requested = os.getenv("SUPERVISOR_JSON_CODEC", "").strip().lower()
+    order = [requested] if requested in _BACKENDS else []
+    order += [name for name in ("orjson", "msgspec", "json") if name not in order]
+    for name in order:
+        try:
+            dumps_fn, loads_fn = _BACKENDS[name]()
+        except ImportError:
+            if name == requested:
+                logger.warning("SUPERVISOR_JSON_CODEC=%s requested but not installed", name)
+            continue
+        return name, dumps_fn, loads_fn
+    raise RuntimeError("No JSON codec available")  # unreachable: stdlib always imports
+
+
+BACKEND, _dumps, _loads = _select_backend()
+
+
+def dumps(obj: Any) -> bytes:
+    """Serialize `obj` to compact UTF-8 JSON bytes."""
+    return _dumps(obj)
+
+
+def loads(data: Any) -> Any:
+    """Parse JSON from bytes or str."""
+    return _loads(data)
+
+
+class CodecJSONResponse(JSONResponse):
+    """FastAPI response class that renders through the selected codec."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,52 @@
+"""
+Whole-request time budget. A Deadline is created when /api/query arrives and
+is consulted by each phase: planning may use a share of what is left, agent
+steps may use everything except a reserve kept back for answer composition,
+and the answer LLM gets whatever remains. Steps that cannot start with a useful
+slice of budget are reported as `deadline_exceeded` instead of being called.
+
+The budget caps every agent call, so it overrides registry `timeout_ms` values
+larger than what is left; the default is sized to fit the slowest registered
+agent (onboarding_buddy_agent, 100 s) plus the answer reserve.
+"""
+from __future__ import annotations
+
+import os
+import time
+from typing import Optional
+
+DEFAULT_REQUEST_BUDGET_MS = int(os.getenv("SUPERVISOR_REQUEST_BUDGET_MS", "120000"))
+PLANNING_BUDGET_SHARE = float(os.getenv("SUPERVISOR_PLANNING_BUDGET_SHARE", "0.25"))
+ANSWER_RESERVE_MS = int(os.getenv("SUPERVISOR_ANSWER_RESERVE_MS", "8000"))
+MIN_STEP_BUDGET_MS = int(os.getenv("SUPERVISOR_MIN_STEP_BUDGET_MS", "1000"))
+
+# Header carrying the remaining budget to HTTP workers.
+DEADLINE_HEADER = "X-Request-Deadline-Ms"
+
+
+class Deadline:
+    def __init__(self, budget_ms: Optional[int] = None) -> None:
+        self.budget_ms = budget_ms or DEFAULT_REQUEST_BUDGET_MS
+        self._expires_at = time.monotonic() + self.budget_ms / 1000
+
+    def remaining_ms(self) -> int:
+        return max(0, int((self._expires_at - time.monotonic()) * 1000))
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining_ms() <= 0
+
+    def planning_timeout_s(self) -> float:
+        return max(0.001, self.remaining_ms() * PLANNING_BUDGET_SHARE / 1000)
+
+    def step_budget_ms(self) -> int:
+        """Budget an agent step may use now; 0 means it should not start."""
+        # Short budgets keep half for the answer rather than starving every
+        # step, and accept proportionally shorter steps.
+        reserve = min(ANSWER_RESERVE_MS, self.budget_ms // 2)
+        minimum = min(MIN_STEP_BUDGET_MS, self.budget_ms // 4)
+        budget = self.remaining_ms() - reserve
+        return budget if budget >= minimum else 0
+
+    def answer_timeout_s(self) -> float:
+        return max(0.001, self.remaining_ms() / 1000)
@@ -4,89 +4,296 @@ outputs for later synthesis or UI debugging.
 """
 from __future__ import annotations
 
+import asyncio
+import os
 import uuid
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, List, Optional, Set, Tuple
 
 try:
     import httpx  # type: ignore
 except ImportError:
     httpx = None
 
-from .agent_caller import call_agent
-from .models import AgentMetadata, AgentRequest, AgentResponse, ErrorModel, Plan, UsedAgentEntry
+from .agent_caller import call_agent, deadline_exceeded_response
+from .codec import dumps
+from .deadline import Deadline
+from .models import AgentMetadata, AgentResponse, ErrorModel, OutputModel, Plan, PlanStep, UsedAgentEntry
 from .registry import find_agent_by_name
 
+# Upper bound on concurrent agent calls within one plan.
+MAX_PARALLEL_STEPS = int(os.getenv("SUPERVISOR_MAX_PARALLEL_STEPS", "4"))
+# Upper bound on concurrent per-file calls when a step fans out over uploads.
+MAX_PARALLEL_FILES = int(os.getenv("SUPERVISOR_MAX_PARALLEL_FILES", "3"))
+# Cap on text chained from one step into the next.
+MAX_CHAINED_INPUT_CHARS = int(os.getenv("SUPERVISOR_MAX_CHAINED_INPUT_CHARS", "8000"))
+
+_MISSING = object()
+
 
 def resolve_input(input_source: str, user_query: str, step_outputs: Dict[int, AgentResponse]) -> str:
     """Resolve an input_source directive into text for the worker."""
-    if input_source == "user_query":
-        return user_query
-    if input_source.startswith("step:"):
-        parts = input_source.split(":")
-        if len(parts) >= 2:
-            step_id_str = parts[1].split(".")[0]
-            try:
-                step_id = int(step_id_str)
-                prior = step_outputs.get(step_id)
-                if prior and prior.output:
-                    return str(prior.output.result)
-            except ValueError:
-                pass
-    return user_query
+    return resolve_step_input(input_source, user_query, step_outputs)[0]
+
+
+def resolve_step_input(
+    input_source: str,
+    user_query: str,
+    step_outputs: Dict[int, AgentResponse],
+) -> Tuple[str, Optional[Any]]:
+    """
+    Resolve an input_source directive into (text, data) for the worker.
 
+    `step:X` and `step:X.output.result` chain the prior step's result; any
+    deeper path (`step:0.output.result.next_deadline`, list indices as
+    numbers) selects a field of it. Structured values are returned as-is in
+    `data` and as compact JSON in `text`; text longer than
+    MAX_CHAINED_INPUT_CHARS is truncated with a marker, in which case `data`
+    is dropped rather than sent half-parsed. Unresolvable references fall back
+    to the user query.
+    """
+    if not input_source.startswith("step:"):
+        return user_query, None
+    step_part, _, path = input_source[len("step:"):].partition(".")
+    try:
+        prior = step_outputs.get(int(step_part))
+    except ValueError:
+        return user_query, None
+    if not prior or not prior.output:
+        return user_query, None
+    value = _select(prior, path.split(".") if path else ["output", "result"])
+    if value is _MISSING or value is None:
+        return user_query, None
 
+    structured = isinstance(value, (dict, list))
+    text = dumps(value).decode() if structured else str(value)
+    if len(text) > MAX_CHAINED_INPUT_CHARS:
+        dropped = len(text) - MAX_CHAINED_INPUT_CHARS
+        return f"{text[:MAX_CHAINED_INPUT_CHARS]}... [truncated {dropped} chars]", None
+    return text, value if structured else None
 
 
+def _select(value: Any, path: List[str]) -> Any:
+    """Walk a dotted path through models, dicts and lists without copying them."""
+    for key in path:
+        if isinstance(value, dict):
+            value = value.get(key, _MISSING)
+        elif isinstance(value, list):
+            try:
+                value = value[int(key)]
+            except (ValueError, IndexError):
+                return _MISSING
+        else:
+            value = getattr(value, key, _MISSING)
+        if value is _MISSING:
+            return _MISSING
+    return value
+
+
+def step_dependencies(plan: Plan) -> Dict[int, Set[int]]:
+    """
+    Map each step_id to the step_ids it reads via `step:X...` input sources.
+    Only references to steps that appear earlier in the plan count, which keeps
+    the graph acyclic and matches the old in-order semantics (a forward
+    reference never had an output yet and fell back to the user query).
+    """
+    deps: Dict[int, Set[int]] = {}
+    seen: Set[int] = set()
+    for step in plan.steps:
+        refs: Set[int] = set()
+        if step.input_source.startswith("step:"):
+            try:
+                refs.add(int(step.input_source.split(":")[1].split(".")[0]))
+            except (IndexError, ValueError):
+                pass
+        deps[step.step_id] = refs & seen
+        seen.add(step.step_id)
+    return deps
+
 
 async def execute_plan(
     query: str,
     plan: Plan,
     registry: List[AgentMetadata],
     context: Dict[str, Any],
+    max_parallel: int = MAX_PARALLEL_STEPS,
+    deadline: Optional[Deadline] = None,
 ) -> Tuple[Dict[int, AgentResponse], List[UsedAgentEntry]]:
-    """Execute each planned step in order and capture responses."""
+    """
+    Execute the plan as a dependency graph: a step starts as soon as the steps
+    it reads from have finished, with at most `max_parallel` agent calls in
+    flight. Outputs and used_agents are returned in step_id order.
+
+    With a `deadline`, a step that has no budget left when its turn comes is
+    not called, and a step still running when the budget runs out is
+    cancelled; both are reported as `deadline_exceeded`.
+    """
     step_outputs: Dict[int, AgentResponse] = {}
-    used_agents: List[UsedAgentEntry] = []
+    deps = step_dependencies(plan)
+    tasks: Dict[int, asyncio.Task] = {}
+    semaphore = asyncio.Semaphore(max(1, max_parallel))
 
-    for step in plan.steps:
+    async def run_step(step: PlanStep) -> None:
+        if deps[step.step_id]:
+            await asyncio.gather(*(tasks[dep] for dep in deps[step.step_id]))
         agent_meta = find_agent_by_name(step.agent, registry)
-        text = resolve_input(step.input_source, query, step_outputs)
-        # Pass file uploads from context to agent caller
-        response = await call_agent(agent_meta, step.intent, text, context)
-        step_outputs[step.step_id] = response
+        failed = sorted(dep for dep in deps[step.step_id] if not step_outputs[dep].is_success())
+        if failed and step.on_dependency_failure == "skip":
+            # Skips cascade: a skipped step is itself a failed dependency.
+            step_outputs[step.step_id] = skipped_response(agent_meta.name, failed[0], step_outputs[failed[0]])
+            return
+        if failed and step.on_dependency_failure == "run":
+            text, data = _failure_input(step_outputs[failed[0]])
+        else:
+            text, data = resolve_step_input(step.input_source, query, step_outputs)
+        async with semaphore:
+            file_uploads = context.get("file_uploads") or []
+            if step.intent in agent_meta.fan_out_intents and len(file_uploads) > 1:
+                step_outputs[step.step_id] = await _fan_out_files(agent_meta, step.intent, text, context, deadline, data)
+            else:
+                step_outputs[step.step_id] = await _call_within_deadline(agent_meta, step.intent, text, context, deadline, data)
+
+    pending: List[asyncio.Task] = []
+    for step in plan.steps:
+        task = asyncio.create_task(run_step(step))
+        tasks[step.step_id] = task
+        pending.append(task)
+    try:
+        await asyncio.gather(*pending)
+    except BaseException:
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        raise
+
+    steps_by_id = {step.step_id: step for step in plan.steps}
+    ordered_ids = sorted(steps_by_id)
+    used_agents: List[UsedAgentEntry] = []
+    for step_id in ordered_ids:
+        step = steps_by_id[step_id]
         used_agents.append(
-            UsedAgentEntry(name=agent_meta.name, intent=step.intent, status=response.status)
+            UsedAgentEntry(name=step.agent, intent=step.intent, status=_step_status(step_outputs[step_id]))
         )
-        
-        # Auto-trigger TDA after KnowledgeBaseBuilderAgent successfully creates tasks
-        if (step.agent == "KnowledgeBaseBuilderAgent" and 
-            response.status == "success" and 
-            step.intent == "create_task"):
-            try:
-                tda_meta = find_agent_by_name("task_dependency_agent", registry)
-                # Call TDA with database trigger - it will retrieve tasks from MongoDB
-                tda_response = await call_agent(
-                    tda_meta,
-                    "task.resolve_dependencies",
-                    "",  # Empty text since TDA uses trigger
-                    context,
-                    custom_input={"trigger": "database_update"}  # Signal to retrieve from DB
-                )
-                # Add TDA to outputs with next step_id
-                next_step_id = max(step_outputs.keys()) + 1 if step_outputs else 0
-                step_outputs[next_step_id] = tda_response
-                used_agents.append(
-                    UsedAgentEntry(
-                        name=tda_meta.name,
-                        intent="task.resolve_dependencies",
-                        status=tda_response.status
-                    )
-                )
-            except KeyError:
-                # TDA not found in registry, skip auto-trigger
-                pass
-            except Exception:
-                # TDA call failed, continue without blocking
-                pass
-
+    step_outputs = {step_id: step_outputs[step_id] for step_id in ordered_ids}
     return step_outputs, used_agents
+
+
+async def _call_within_deadline(
+    agent_meta: AgentMetadata,
+    intent: str,
+    text: str,
+    context: Dict[str, Any],
+    deadline: Optional[Deadline],
+    input_data: Optional[Any] = None,
+) -> AgentResponse:
+    """Call the agent, skipping or cancelling it when the request budget is spent."""
+    if deadline is None:
+        # Pass file uploads from context to agent caller
+        return await call_agent(agent_meta, intent, text, context, input_data=input_data)
+    budget_ms = deadline.step_budget_ms()
+    if budget_ms <= 0:
+        return deadline_exceeded_response(str(uuid.uuid4()), agent_meta.name)
+    try:
+        # Hard cap covering bulkhead queueing and breaker probes as well as
+        # the call itself, which call_agent already bounds by the same budget.
+        return await asyncio.wait_for(
+            call_agent(agent_meta, intent, text, context, deadline=deadline, input_data=input_data),
+            timeout=budget_ms / 1000,
+        )
+    except asyncio.TimeoutError:
+        return deadline_exceeded_response(str(uuid.uuid4()), agent_meta.name)
+
+
+async def _fan_out_files(
+    agent_meta: AgentMetadata,
+    intent: str,
+    text: str,
+    context: Dict[str, Any],
+    deadline: Optional[Deadline],
+    input_data: Optional[Any] = None,
+) -> AgentResponse:
+    """Run the step once per uploaded file, at most MAX_PARALLEL_FILES at a time, and merge the replies."""
+    uploads = context["file_uploads"]
+    limit = asyncio.Semaphore(max(1, MAX_PARALLEL_FILES))
+
+    async def one(upload: Dict[str, Any]) -> AgentResponse:
+        async with limit:
+            # Every agent call forwards the first upload, so give each call a context holding just one.
+            return await _call_within_deadline(
+                agent_meta, intent, text, {**context, "file_uploads": [upload]}, deadline, input_data
+            )
+
+    responses = await asyncio.gather(*(one(upload) for upload in uploads))
+    return merge_file_responses(agent_meta.name, uploads, responses)
+
+
+def merge_file_responses(
+    agent_name: str,
+    uploads: List[Dict[str, Any]],
+    responses: List[AgentResponse],
+) -> AgentResponse:
+    """
+    Combine per-file replies into one step output: a markdown section per file
+    in `result` and the individual outputs (or errors) in `details["files"]`.
+    The step succeeds if any file succeeded; if none did, the first error wins.
+    """
+    sections: List[str] = []
+    files: List[Dict[str, Any]] = []
+    for upload, response in zip(uploads, responses):
+        filename = upload.get("filename", "uploaded_file")
+        if response.is_success():
+            sections.append(f"**{filename}**\n\n{_as_text(response.output.result)}")
+            files.append({"filename": filename, "status": response.status, "output": response.output.model_dump()})
+        else:
+            message = response.error.message if response.error else response.status
+            sections.append(f"**{filename}**: failed ({message})")
+            files.append({
+                "filename": filename,
+                "status": response.status,
+                "error": response.error.model_dump() if response.error else None,
+            })
+
+    succeeded = [r for r in responses if r.is_success()]
+    if not succeeded:
+        first = responses[0]
+        return first.model_copy(update={"request_id": str(uuid.uuid4()), "agent_name": agent_name})
+    return AgentResponse(
+        request_id=str(uuid.uuid4()),
+        agent_name=agent_name,
+        status="success",
+        output=OutputModel(
+            result="\n\n---\n\n".join(sections),
+            details={"files": files, "succeeded": len(succeeded), "failed": len(responses) - len(succeeded)},
+        ),
+    )
+
+
+def _as_text(value: Any) -> str:
+    return value if isinstance(value, str) else dumps(value).decode()
+
+
+def skipped_response(agent_name: str, dep_step_id: int, dep_response: AgentResponse) -> AgentResponse:
+    return AgentResponse(
+        request_id=str(uuid.uuid4()),
+        agent_name=agent_name,
+        status="skipped",
+        error=ErrorModel(
+            type="dependency_failed",
+            message=f"Skipped because step {dep_step_id} ({dep_response.agent_name}) did not succeed",
+        ),
+    )
+
+
+def _failure_input(dep_response: AgentResponse) -> Tuple[str, Dict[str, Any]]:
+    """Input for an on_dependency_failure="run" step: the failed step's status and error."""
+    data = {
+        "agent_name": dep_response.agent_name,
+        "status": dep_response.status,
+        "error": dep_response.error.model_dump() if dep_response.error else None,
+    }
+    return dumps(data).decode(), data
+
+
+def _step_status(response: AgentResponse) -> str:
+    if response.error and response.error.type == "deadline_exceeded":
+        return "deadline_exceeded"
+    return response.status
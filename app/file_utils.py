@@ -4,8 +4,13 @@ Centralizes file upload parsing and validation logic.
 """
 from __future__ import annotations
 
+import logging
 import re
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Optional
+
+from .upload_store import get_upload_store
+
+logger = logging.getLogger(__name__)
 
 # Constants
 FILE_UPLOAD_MARKER_PATTERN = r'\[FILE_UPLOAD:(.+):([^:]+):([^\]]+)\]'
@@ -161,3 +166,26 @@ def normalize_file_uploads(
     
     return query_text, file_uploads
 
+
+def store_file_uploads(file_uploads: List[Dict[str, str]]) -> List[Dict[str, Any]]:
+    """
+    Decode validated uploads into the content-addressed upload store, pinned
+    until the caller releases them with `UploadStore.release`.
+    
+    Args:
+        file_uploads: Validated upload dicts from normalize_file_uploads
+        
+    Returns:
+        List of file references (digest, filename, mime_type, size) in the same
+        order; uploads that fail to decode are dropped.
+    """
+    store = get_upload_store()
+    refs: List[Dict[str, Any]] = []
+    for upload in file_uploads:
+        try:
+            entry = store.put(upload['base64_data'], upload['filename'], upload['mime_type'], pin=True)
+        except ValueError as exc:
+            logger.warning("Dropping upload: %s", exc)
+            continue
+        refs.append(entry.ref())
+    return refs
@@ -0,0 +1,176 @@
+"""
+Pooled outbound HTTP clients for worker agents. One httpx.AsyncClient is kept
+per scheme/host/port so keep-alive connections (and HTTP/2 streams when
+enabled) are reused across plan steps instead of paying a fresh TCP/TLS
+handshake on every call. The pool is opened and closed by the FastAPI lifespan
+in app.server; callers outside the app (scripts, tests) get a lazily created
+pool so `call_agent` keeps working without the server.
+
+Co-deployed agents (`type="inproc"`) get a client bound to an in-memory ASGI
+transport instead: requests go straight into the agent's app object with no
+socket, and the app's own lifespan runs for as long as the pool is open.
+"""
+from __future__ import annotations
+
+import asyncio
+import importlib
+import logging
+import os
+from contextlib import AsyncExitStack
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit
+
+try:
+    import httpx  # type: ignore
+except ImportError:
+    httpx = None
+
+try:
+    import h2  # type: ignore  # noqa: F401  (httpx needs it for HTTP/2)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Tunables; defaults favour a handful of remote hosts with bursty traffic.
+HTTP_MAX_CONNECTIONS = int(os.getenv("SUPERVISOR_HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("SUPERVISOR_HTTP_MAX_KEEPALIVE", "20"))
+HTTP_KEEPALIVE_EXPIRY_S = float(os.getenv("SUPERVISOR_HTTP_KEEPALIVE_EXPIRY_S", "60"))
+HTTP2_ENABLED = os.getenv("SUPERVISOR_HTTP2", "0").lower() in {"1", "true", "yes"}
+HTTP_DEFAULT_TIMEOUT_S = 30.0
+
+
+class ClientPool:
+    """Per-host registry of long-lived AsyncClients with hit/miss counters."""
+
+    def __init__(
+        self,
+        max_connections: int = HTTP_MAX_CONNECTIONS,
+        max_keepalive: int = HTTP_MAX_KEEPALIVE,
+        keepalive_expiry_s: float = HTTP_KEEPALIVE_EXPIRY_S,
+        http2: bool = HTTP2_ENABLED,
+    ) -> None:
+        if http2 and not HTTP2_AVAILABLE:
+            logger.warning("SUPERVISOR_HTTP2 requested but 'h2' is not installed; using HTTP/1.1")
+            http2 = False
+        self.max_connections = max_connections
+        self.max_keepalive = max_keepalive
+        self.keepalive_expiry_s = keepalive_expiry_s
+        self.http2 = http2
+        self.hits = 0
+        self.misses = 0
+        self._clients: Dict[str, Any] = {}
+        self._app_lock = asyncio.Lock()
+        self._app_lifespans = AsyncExitStack()
+
+    @staticmethod
+    def _host_key(url: str) -> str:
+        parts = urlsplit(url)
+        port = parts.port or (443 if parts.scheme == "https" else 80)
+        return f"{parts.scheme}://{parts.hostname}:{port}"
+
+    def client_for(self, url: str):
+        """Return the shared client for the host serving `url`, creating it on first use."""
+        key = self._host_key(url)
+        client = self._clients.get(key)
+        if client is not None and not client.is_closed:
+            self.hits += 1
+            return client
+        self.misses += 1
+        client = httpx.AsyncClient(
+            timeout=HTTP_DEFAULT_TIMEOUT_S,
+            http2=self.http2,
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_keepalive,
+                keepalive_expiry=self.keepalive_expiry_s,
+            ),
+        )
+        self._clients[key] = client
+        return client
+
+    async def client_for_app(self, app_path: str):
+        """Return a client wired to the ASGI app at `module:attribute`, starting its lifespan once."""
+        key = f"asgi:{app_path}"
+        client = self._clients.get(key)
+        if client is not None and not client.is_closed:
+            self.hits += 1
+            return client
+        async with self._app_lock:
+            client = self._clients.get(key)
+            if client is not None and not client.is_closed:
+                self.hits += 1
+                return client
+            self.misses += 1
+            asgi_app = _import_app(app_path)
+            router = getattr(asgi_app, "router", None)
+            if router is not None and hasattr(router, "lifespan_context"):
+                await self._app_lifespans.enter_async_context(router.lifespan_context(asgi_app))
+            client = httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=asgi_app),
+                timeout=HTTP_DEFAULT_TIMEOUT_S,
+            )
+            self._clients[key] = client
+            logger.info("Mounted in-process agent app %s", app_path)
+            return client
+
+    async def aclose(self) -> None:
+        clients, self._clients = list(self._clients.values()), {}
+        for client in clients:
+            try:
+                await client.aclose()
+            except Exception as exc:
+                logger.warning("Failed to close pooled HTTP client: %s", exc)
+        try:
+            await self._app_lifespans.aclose()
+        except Exception as exc:
+            logger.warning("In-process agent app shutdown failed: %s", exc)
+        self._app_lifespans = AsyncExitStack()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "hosts": sorted(self._clients.keys()),
+            "hits": self.hits,
+            "misses": self.misses,
+            "http2": self.http2,
+            "max_connections": self.max_connections,
+            "max_keepalive": self.max_keepalive,
+            "keepalive_expiry_s": self.keepalive_expiry_s,
+        }
+
+
+def _import_app(app_path: str) -> Any:
+    """Resolve a `package.module:attribute` path to an ASGI app object."""
+    module_name, _, attribute = app_path.partition(":")
+    if not module_name or not attribute:
+        raise ValueError(f"asgi_app must look like 'package.module:app', got {app_path!r}")
+    return getattr(importlib.import_module(module_name), attribute)
+
+
+_POOL: Optional[ClientPool] = None
+
+
+def get_client_pool() -> ClientPool:
+    """Return the process-wide pool, creating it lazily if the lifespan has not run."""
+    global _POOL
+    if _POOL is None:
+        _POOL = ClientPool()
+    return _POOL
+
+
+async def open_client_pool() -> ClientPool:
+    """Create a fresh pool at application startup."""
+    global _POOL
+    if _POOL is not None:
+        await _POOL.aclose()
+    _POOL = ClientPool()
+    return _POOL
+
+
+async def close_client_pool() -> None:
+    """Close every pooled connection at application shutdown."""
+    global _POOL
+    if _POOL is not None:
+        await _POOL.aclose()
+        _POOL = None
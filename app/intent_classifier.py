@@ -0,0 +1,431 @@
+"""
+Local intent classifier: a planner tier between the keyword router / plan
+caches and the LLM. A softmax-regression model over the hashed features of
+app.text_features maps a query to one of the plans it was trained on; when its
+top probability reaches INTENT_CLASSIFIER_THRESHOLD that plan is used and the
+LLM call is skipped, otherwise the planner falls through to the LLM.
+
+Labels are plan signatures (the steps' agent, intent, input_source and failure
+policy), so the two-step focus chains are learnable too; out-of-scope queries
+form their own label, which the planner treats as "ask the LLM". Training data
+comes from three places:
+
+- keyword seeds: phrases built from the routing table's keywords, labelled
+  with whatever plan `route_query` returns for them (phrases it does not route
+  are dropped, since an earlier rule can claim another rule's keyword);
+- heuristics: logged queries that the current routing rules match;
+- LLM plans: logged queries the LLM planned (rule None in the decision log).
+
+Keyword seeds only cover phrasings the router already handles, and a model
+fitted to them alone confidently maps unrelated queries onto some agent. Seeds
+therefore include a few hundred out-of-scope phrasings, and the model file
+records how many LLM-planned queries it was trained on: below
+INTENT_MIN_LLM_EXAMPLES the server refuses to load it.
+
+With SUPERVISOR_PLANNER_LOG enabled (off by default) the planner appends each
+decision to PLANNER_LOG_PATH as a JSON line, in a worker thread. Queries are
+cut to PLANNER_LOG_MAX_QUERY_CHARS, and the file is rotated to `<path>.1` once
+it passes PLANNER_LOG_MAX_BYTES. Train and export a model with
+
+    python -m app.intent_classifier train [--log PATH] [--out PATH]
+
+and inspect one with `python -m app.intent_classifier info [--model PATH]`.
+The server loads the model file once at startup. NumPy only; without it (or
+without a model file) the tier is skipped.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .models import AgentMetadata, Plan, PlanStep
+from .plan_cache import registry_fingerprint
+from .routing import ROUTING_RULES, route_query
+from .text_features import FEATURE_DIM, NUMPY_AVAILABLE, featurize, featurize_many, np
+
+logger = logging.getLogger(__name__)
+
+INTENT_MODEL_PATH = os.getenv("SUPERVISOR_INTENT_MODEL_PATH", ".supervisor_cache/intent_model.npz")
+INTENT_CLASSIFIER_THRESHOLD = float(os.getenv("SUPERVISOR_INTENT_CLASSIFIER_THRESHOLD", "0.85"))
+INTENT_MIN_LLM_EXAMPLES = int(os.getenv("SUPERVISOR_INTENT_MIN_LLM_EXAMPLES", "200"))
+PLANNER_LOG_ENABLED = os.getenv("SUPERVISOR_PLANNER_LOG", "0").lower() in {"1", "true", "yes"}
+PLANNER_LOG_PATH = os.getenv("SUPERVISOR_PLANNER_LOG_PATH", ".supervisor_cache/planner_decisions.jsonl")
+PLANNER_LOG_MAX_BYTES = int(os.getenv("SUPERVISOR_PLANNER_LOG_MAX_BYTES", str(5 * 1024 * 1024)))
+# Planner phrasing sits at the head of a query; a pasted document's body is not kept.
+PLANNER_LOG_MAX_QUERY_CHARS = 300
+
+# Label of queries the LLM declared out of scope.
+OUT_OF_SCOPE = "[]"
+SIGNATURE_FIELDS = ("agent", "intent", "input_source", "on_dependency_failure")
+# Out-of-scope phrasings for the "defer" class: small talk, plus request verbs
+# the agents also use paired with topics none of them handle, so a verb alone
+# ("show me", "send", "check") never decides the plan.
+OUT_OF_SCOPE_SEEDS = (
+    "hello", "hi there", "hey", "good morning", "good night", "thanks", "thank you so much",
+    "how are you", "who are you", "what can you do", "bye", "see you later", "ok cool", "nice",
+    "what's up", "are you a robot", "what is your name", "i am bored", "tell me a joke",
+    "sing me a song", "what is 2 plus 2", "flip a coin", "roll a dice", "who is the president",
+    "is it going to rain", "what day is it today", "write a poem", "who won the game last night",
+    "translate this to french", "what is the capital of france", "recommend a movie",
+)
+OUT_OF_SCOPE_VERBS = (
+    "tell me", "what is", "show me", "find", "search for", "text", "send", "play", "book", "order",
+    "recommend", "translate", "write", "read me", "give me", "check", "look up", "explain",
+    "how do i get", "can you get me",
+)
+OUT_OF_SCOPE_TOPICS = (
+    "the news", "the weather tomorrow", "a pizza", "a flight to london", "my horoscope",
+    "the football score", "some music", "a recipe for pasta", "the stock price of apple",
+    "a taxi home", "a hotel room in rome", "a birthday card for my sister", "the lottery numbers",
+    "a song by queen", "a bedtime story", "the traffic on the highway", "the time in tokyo",
+    "a poem about love", "a gift idea for my dad", "the meaning of life", "a good restaurant nearby",
+    "the latest celebrity gossip", "a workout routine", "the movie showtimes", "a cat fact",
+    "the population of canada", "a riddle", "the rules of chess", "my friend a happy birthday",
+    "the capital of peru",
+)
+
+
+def plan_signature(steps: Iterable[Any]) -> str:
+    """Canonical label for a plan: its steps without ids, as compact JSON."""
+    rows = []
+    for step in steps:
+        data = step.model_dump() if isinstance(step, PlanStep) else step
+        rows.append([data.get(field, "fallback" if field == "on_dependency_failure" else None) for field in SIGNATURE_FIELDS])
+    return json.dumps(rows, separators=(",", ":"))
+
+
+def steps_from_signature(signature: str) -> List[Dict[str, Any]]:
+    return [
+        {"step_id": step_id, **dict(zip(SIGNATURE_FIELDS, row))}
+        for step_id, row in enumerate(json.loads(signature))
+    ]
+
+
+class IntentClassifier:
+    def __init__(
+        self,
+        weights,
+        bias,
+        labels: List[str],
+        dim: int,
+        fingerprint: Optional[str] = None,
+        llm_examples: int = 0,
+    ) -> None:
+        self.weights = weights
+        self.bias = bias
+        self.labels = labels
+        self.dim = dim
+        self.fingerprint = fingerprint
+        # LLM-planned queries in the training set; seeds alone do not make a servable model.
+        self.llm_examples = llm_examples
+        self.predictions = 0
+        self.confident = 0
+
+    @classmethod
+    def load(cls, path: str) -> "IntentClassifier":
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(str(data["meta"]))
+            return cls(
+                data["weights"].astype(np.float32),
+                data["bias"].astype(np.float32),
+                meta["labels"],
+                int(meta["dim"]),
+                meta.get("fingerprint"),
+                int(meta.get("llm_examples", 0)),
+            )
+
+    def save(self, path: str, extra: Optional[Dict[str, Any]] = None) -> None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        meta = {
+            "labels": self.labels,
+            "dim": self.dim,
+            "fingerprint": self.fingerprint,
+            "llm_examples": self.llm_examples,
+            **(extra or {}),
+        }
+        np.savez_compressed(path, weights=self.weights, bias=self.bias, meta=np.array(json.dumps(meta)))
+
+    def predict_proba(self, features):
+        logits = features @ self.weights + self.bias
+        logits -= logits.max(axis=-1, keepdims=True)
+        exp = np.exp(logits)
+        return exp / exp.sum(axis=-1, keepdims=True)
+
+    def predict(self, query: str) -> Tuple[str, float]:
+        probs = self.predict_proba(featurize(query, self.dim))
+        index = int(np.argmax(probs))
+        return self.labels[index], float(probs[index])
+
+    def plan_for(self, query: str, threshold: float = INTENT_CLASSIFIER_THRESHOLD) -> Optional[List[Dict[str, Any]]]:
+        """Raw steps for a confident in-scope prediction, else None (defer to the LLM)."""
+        self.predictions += 1
+        label, confidence = self.predict(query)
+        if confidence < threshold or label == OUT_OF_SCOPE:
+            return None
+        self.confident += 1
+        logger.info("Intent classifier planned %r with p=%.3f", query[:80], confidence)
+        return steps_from_signature(label)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "labels": len(self.labels),
+            "dim": self.dim,
+            "predictions": self.predictions,
+            "confident": self.confident,
+            "threshold": INTENT_CLASSIFIER_THRESHOLD,
+        }
+
+
+_CLASSIFIER: Optional[IntentClassifier] = None
+
+
+def load_intent_classifier(
+    registry: List[AgentMetadata],
+    path: str = INTENT_MODEL_PATH,
+    min_llm_examples: int = INTENT_MIN_LLM_EXAMPLES,
+) -> Optional[IntentClassifier]:
+    """Load the model file once at startup; a missing file or NumPy just disables the tier."""
+    global _CLASSIFIER
+    _CLASSIFIER = None
+    if not NUMPY_AVAILABLE or not path or not os.path.exists(path):
+        return None
+    try:
+        model = IntentClassifier.load(path)
+    except Exception as exc:
+        logger.warning("Could not load intent classifier from %s: %s", path, exc)
+        return None
+    if model.llm_examples < min_llm_examples:
+        logger.warning(
+            "Intent classifier at %s was trained on %d LLM-planned queries (need %d); not serving it. "
+            "Enable SUPERVISOR_PLANNER_LOG and retrain once enough decisions are logged.",
+            path,
+            model.llm_examples,
+            min_llm_examples,
+        )
+        return None
+    _CLASSIFIER = model
+    if _CLASSIFIER.fingerprint != registry_fingerprint(registry):
+        # Predictions are still re-validated against the registry before use.
+        logger.warning("Intent classifier at %s was trained for another registry; consider retraining", path)
+    logger.info("Loaded intent classifier with %d labels from %s", len(_CLASSIFIER.labels), path)
+    return _CLASSIFIER
+
+
+def get_intent_classifier() -> Optional[IntentClassifier]:
+    return _CLASSIFIER
+
+
+_LOG_LOCK = threading.Lock()
+
+
+def decision_entry(query: str, plan: Plan) -> Dict[str, Any]:
+    return {
+        "ts": time.time(),
+        "query": query[:PLANNER_LOG_MAX_QUERY_CHARS],
+        "tier": plan.rule,
+        "steps": [step.model_dump() for step in plan.steps],
+    }
+
+
+def write_decision(entry: Dict[str, Any], path: str = PLANNER_LOG_PATH, max_bytes: int = PLANNER_LOG_MAX_BYTES) -> None:
+    """Append one decision to the JSON-lines log, rotating it when full. Blocking; run it off the event loop."""
+    line = json.dumps(entry) + "\n"
+    try:
+        with _LOG_LOCK:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            if os.path.exists(path) and os.path.getsize(path) + len(line) > max_bytes:
+                os.replace(path, f"{path}.1")
+            with open(path, "a", encoding="utf-8") as fh:
+                fh.write(line)
+    except OSError as exc:
+        logger.warning("Could not write planner decision log %s: %s", path, exc)
+
+
+async def log_planner_decision(query: str, plan: Plan) -> None:
+    """Record a planner decision as training data, if decision logging is enabled."""
+    if not PLANNER_LOG_ENABLED or not PLANNER_LOG_PATH:
+        return
+    await asyncio.to_thread(write_decision, decision_entry(query, plan), PLANNER_LOG_PATH, PLANNER_LOG_MAX_BYTES)
+
+
+# -- training ----------------------------------------------------------------
+
+
+def seed_phrases() -> List[str]:
+    """Phrases built from the routing table's keywords, AND-clauses and intent selectors."""
+    phrases: List[str] = []
+    for rule in ROUTING_RULES:
+        if rule.requires:
+            phrases.extend(f"{kw} {req}" for kw in rule.keywords for req in rule.requires)
+        else:
+            phrases.extend(rule.keywords)
+        for selector_keywords, _ in rule.intent_selector:
+            phrases.extend(f"{kw} {sel}" for kw in rule.keywords for sel in selector_keywords)
+    return sorted(set(phrases))
+
+
+def seed_examples() -> List[Tuple[str, str]]:
+    """(text, label) pairs labelled by what the keyword router actually plans for each phrase."""
+    examples: List[Tuple[str, str]] = []
+    for phrase in seed_phrases():
+        routed = route_query(phrase)
+        if routed is not None:
+            examples.append((phrase, plan_signature(routed.steps)))
+    examples.extend((text, OUT_OF_SCOPE) for text in out_of_scope_phrases() if route_query(text) is None)
+    return examples
+
+
+def out_of_scope_phrases() -> List[str]:
+    """Small talk plus every out-of-scope verb/topic pairing."""
+    phrases = list(OUT_OF_SCOPE_SEEDS)
+    phrases.extend(f"{verb} {topic}" for verb in OUT_OF_SCOPE_VERBS for topic in OUT_OF_SCOPE_TOPICS)
+    return sorted(set(phrases))
+
+
+def _log_lines(path: str) -> Iterable[str]:
+    """Lines of the rotated and the current decision log, oldest first."""
+    for candidate in (f"{path}.1", path):
+        if os.path.exists(candidate):
+            with open(candidate, encoding="utf-8") as fh:
+                yield from fh
+
+
+def logged_examples(path: str) -> List[Tuple[str, str]]:
+    """(query, label) pairs from the decision log: heuristic labels first, then LLM plans."""
+    return [(query, label) for query, label, _ in _logged(path)]
+
+
+def _logged(path: str) -> Iterable[Tuple[str, str, bool]]:
+    """(query, label, planned_by_llm) for each usable decision-log entry."""
+    if not path:
+        return
+    for line in _log_lines(path):
+        try:
+            entry = json.loads(line)
+        except json.JSONDecodeError:
+            continue
+        query = entry.get("query") or ""
+        if not query.strip():
+            continue
+        routed = route_query(query)
+        if routed is not None:
+            yield query, plan_signature(routed.steps), False
+        elif entry.get("tier") is None:
+            yield query, plan_signature(entry.get("steps") or []), True
+
+
+def train(
+    examples: List[Tuple[str, str]],
+    dim: int = FEATURE_DIM,
+    epochs: int = 1000,
+    learning_rate: float = 5.0,
+    l2: float = 1e-5,
+    fingerprint: Optional[str] = None,
+    llm_examples: int = 0,
+) -> IntentClassifier:
+    """Full-batch gradient descent on softmax cross-entropy with L2 regularization."""
+    labels = sorted({label for _, label in examples})
+    label_index = {label: i for i, label in enumerate(labels)}
+    features = featurize_many([text for text, _ in examples], dim)
+    targets = np.zeros((len(examples), len(labels)), dtype=np.float32)
+    targets[np.arange(len(examples)), [label_index[label] for _, label in examples]] = 1.0
+
+    model = IntentClassifier(
+        np.zeros((dim, len(labels)), dtype=np.float32),
+        np.zeros(len(labels), dtype=np.float32),
+        labels,
+        dim,
+        fingerprint,
+        llm_examples,
+    )
+    n = max(1, len(examples))
+    for _ in range(epochs):
+        error = model.predict_proba(features) - targets
+        model.weights -= learning_rate * (features.T @ error / n + l2 * model.weights)
+        model.bias -= learning_rate * error.mean(axis=0)
+    return model
+
+
+def accuracy(model: IntentClassifier, examples: List[Tuple[str, str]]) -> float:
+    if not examples:
+        return 0.0
+    probs = model.predict_proba(featurize_many([text for text, _ in examples], model.dim))
+    predicted = [model.labels[i] for i in np.argmax(probs, axis=1)]
+    return sum(p == label for p, (_, label) in zip(predicted, examples)) / len(examples)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.intent_classifier", description=__doc__.split("\n\n")[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+    train_cmd = sub.add_parser("train", help="train on seeds + decision log and export a model file")
+    train_cmd.add_argument("--log", default=PLANNER_LOG_PATH, help="planner decision log (JSON lines)")
+    train_cmd.add_argument("--out", default=INTENT_MODEL_PATH, help="model file to write (.npz)")
+    train_cmd.add_argument("--dim", type=int, default=FEATURE_DIM)
+    train_cmd.add_argument("--epochs", type=int, default=1000)
+    train_cmd.add_argument("--learning-rate", type=float, default=5.0)
+    train_cmd.add_argument("--l2", type=float, default=1e-5)
+    train_cmd.add_argument("--holdout", type=float, default=0.1, help="fraction of logged queries held out for evaluation")
+    info_cmd = sub.add_parser("info", help="describe a trained model file")
+    info_cmd.add_argument("--model", default=INTENT_MODEL_PATH)
+    args = parser.parse_args(argv)
+
+    if not NUMPY_AVAILABLE:
+        parser.error("numpy is required (pip install numpy)")
+
+    if args.command == "info":
+        model = IntentClassifier.load(args.model)
+        print(json.dumps({
+            "path": args.model,
+            "labels": model.labels,
+            "dim": model.dim,
+            "fingerprint": model.fingerprint,
+            "llm_examples": model.llm_examples,
+            "servable": model.llm_examples >= INTENT_MIN_LLM_EXAMPLES,
+        }, indent=2))
+        return 0
+
+    from .registry import load_registry
+
+    seeds = seed_examples()
+    logged = list(_logged(args.log))
+    rng = np.random.default_rng(0)
+    order = rng.permutation(len(logged))
+    cut = int(len(logged) * args.holdout)
+    held_out = [logged[i][:2] for i in order[:cut]]
+    training = seeds + [logged[i][:2] for i in order[cut:]]
+    llm_examples = sum(1 for i in order[cut:] if logged[i][2])
+    model = train(
+        training,
+        dim=args.dim,
+        epochs=args.epochs,
+        learning_rate=args.learning_rate,
+        l2=args.l2,
+        fingerprint=registry_fingerprint(load_registry()),
+        llm_examples=llm_examples,
+    )
+    report = {
+        "seed_examples": len(seeds),
+        "logged_examples": len(logged),
+        "llm_examples": llm_examples,
+        "servable": llm_examples >= INTENT_MIN_LLM_EXAMPLES,
+        "labels": len(model.labels),
+        "train_accuracy": round(accuracy(model, training), 4),
+        "holdout_accuracy": round(accuracy(model, held_out), 4) if held_out else None,
+    }
+    model.save(args.out, extra={"trained_at": time.time(), "report": report})
+    print(json.dumps({"model": args.out, **report}, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,145 @@
+"""
+In-process background jobs for follow-up work that should not hold up the
+user's answer. A job wraps one coroutine in its own asyncio task, records its
+status (pending -> running -> succeeded/failed) and keeps the result around for
+a while so the UI can poll `GET /api/jobs/{job_id}`. Jobs live in memory only;
+a restart forgets them, which is acceptable for best-effort follow-ups.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from .models import AgentResponse, BackgroundJob
+
+logger = logging.getLogger(__name__)
+
+JOB_RETENTION_S = float(os.getenv("SUPERVISOR_JOB_RETENTION_S", "900"))
+JOB_MAX_RETAINED = int(os.getenv("SUPERVISOR_JOB_MAX_RETAINED", "256"))
+
+PENDING = "pending"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+
+class Job:
+    def __init__(self, kind: str) -> None:
+        self.job_id = str(uuid.uuid4())
+        self.kind = kind
+        self.status = PENDING
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.result: Optional[AgentResponse] = None
+        self.error: Optional[str] = None
+        self.task: Optional[asyncio.Task] = None
+
+    @property
+    def done(self) -> bool:
+        return self.status in {SUCCEEDED, FAILED}
+
+    def summary(self) -> BackgroundJob:
+        return BackgroundJob(
+            job_id=self.job_id,
+            kind=self.kind,
+            status=self.status,
+            poll_url=f"/api/jobs/{self.job_id}",
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            **self.summary().model_dump(),
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+            "result": self.result.model_dump() if self.result else None,
+            "error": self.error,
+        }
+
+
+class JobRegistry:
+    def __init__(self, retention_s: float = JOB_RETENTION_S, max_retained: int = JOB_MAX_RETAINED) -> None:
+        self.retention_s = retention_s
+        self.max_retained = max(1, max_retained)
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self.submitted = 0
+        self.succeeded = 0
+        self.failed = 0
+
+    def submit(self, kind: str, fn: Callable[[], Awaitable[AgentResponse]]) -> Job:
+        """Start `fn` as a detached task; it is not cancelled with the request that submitted it."""
+        self._prune()
+        job = Job(kind)
+        job.task = asyncio.create_task(self._run(job, fn))
+        self._jobs[job.job_id] = job
+        self.submitted += 1
+        return job
+
+    async def _run(self, job: Job, fn: Callable[[], Awaitable[AgentResponse]]) -> None:
+        job.status = RUNNING
+        try:
+            job.result = await fn()
+            job.status = SUCCEEDED if job.result.is_success() else FAILED
+            if job.result.error:
+                job.error = job.result.error.message
+        except asyncio.CancelledError:
+            job.status = FAILED
+            job.error = "cancelled"
+            raise
+        except Exception as exc:
+            logger.exception("Background job %s (%s) failed", job.job_id, job.kind)
+            job.status = FAILED
+            job.error = str(exc)
+        finally:
+            job.finished_at = time.time()
+            if job.status == SUCCEEDED:
+                self.succeeded += 1
+            else:
+                self.failed += 1
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def _prune(self) -> None:
+        cutoff = time.time() - self.retention_s
+        for job_id, job in list(self._jobs.items()):
+            if job.done and (job.finished_at or 0) < cutoff:
+                del self._jobs[job_id]
+        # Over the cap, drop the oldest finished jobs; running ones are kept.
+        excess = len(self._jobs) - self.max_retained
+        for job_id, job in list(self._jobs.items()):
+            if excess <= 0:
+                break
+            if job.done:
+                del self._jobs[job_id]
+                excess -= 1
+
+    async def aclose(self) -> None:
+        running = [job.task for job in self._jobs.values() if job.task and not job.task.done()]
+        for task in running:
+            task.cancel()
+        await asyncio.gather(*running, return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        running = sum(1 for job in self._jobs.values() if not job.done)
+        return {
+            "retained": len(self._jobs),
+            "running": running,
+            "submitted": self.submitted,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+        }
+
+
+_JOBS: Optional[JobRegistry] = None
+
+
+def get_job_registry() -> JobRegistry:
+    global _JOBS
+    if _JOBS is None:
+        _JOBS = JobRegistry()
+    return _JOBS
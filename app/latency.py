@@ -0,0 +1,153 @@
+"""
+Observed agent latency and the adaptive timeouts derived from it. Each agent
+keeps a rolling window of round-trip samples per intent, plus a separate
+cold-start window for calls made after the worker has been idle long enough to
+have gone to sleep (free-tier Render/Railway hosts). Warm calls get a timeout of
+p99 x factor, clamped between a floor and the registry `timeout_ms`; cold calls
+always get the full registry budget.
+
+A call that times out is recorded as a censored sample at the timeout it was
+given (its true latency is at least that), and each consecutive timeout on an
+intent multiplies its next timeout by TIMEOUT_BACKOFF until a call succeeds.
+Without both, an agent whose latency rises above the old p99 x factor would
+time out on every warm call and never widen its own window.
+"""
+from __future__ import annotations
+
+import math
+import os
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+from .models import AgentMetadata
+
+LATENCY_WINDOW = int(os.getenv("SUPERVISOR_LATENCY_WINDOW", "200"))
+LATENCY_MIN_SAMPLES = int(os.getenv("SUPERVISOR_LATENCY_MIN_SAMPLES", "20"))
+TIMEOUT_P99_FACTOR = float(os.getenv("SUPERVISOR_TIMEOUT_P99_FACTOR", "3.0"))
+TIMEOUT_FLOOR_MS = int(os.getenv("SUPERVISOR_TIMEOUT_FLOOR_MS", "2000"))
+COLD_IDLE_S = float(os.getenv("SUPERVISOR_COLD_IDLE_S", "600"))
+TIMEOUT_BACKOFF = float(os.getenv("SUPERVISOR_TIMEOUT_BACKOFF", "2.0"))
+
+
+class LatencyWindow:
+    """Fixed-size rolling window of latency samples in milliseconds."""
+
+    def __init__(self, size: int = LATENCY_WINDOW) -> None:
+        self._samples: Deque[float] = deque(maxlen=size)
+        self.total = 0
+
+    def add(self, elapsed_ms: float) -> None:
+        self._samples.append(elapsed_ms)
+        self.total += 1
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, max(0, math.ceil(pct / 100 * len(ordered)) - 1))
+        return ordered[index]
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "samples": len(self._samples),
+            "total": self.total,
+            "p50_ms": _round(self.percentile(50)),
+            "p95_ms": _round(self.percentile(95)),
+            "p99_ms": _round(self.percentile(99)),
+        }
+
+
+def _round(value: Optional[float]) -> Optional[float]:
+    return round(value, 1) if value is not None else None
+
+
+class AgentLatency:
+    """Latency state for one agent: per-intent warm windows and one cold window."""
+
+    def __init__(self) -> None:
+        self.intents: Dict[str, LatencyWindow] = {}
+        self.cold = LatencyWindow()
+        self.last_contact: Optional[float] = None
+        # Consecutive timeouts per intent; reset by the next completed call.
+        self.timeout_streaks: Dict[str, int] = {}
+
+
+class LatencyTracker:
+    def __init__(self) -> None:
+        self._agents: Dict[str, AgentLatency] = {}
+
+    def _agent(self, name: str) -> AgentLatency:
+        state = self._agents.get(name)
+        if state is None:
+            state = AgentLatency()
+            self._agents[name] = state
+        return state
+
+    def is_cold(self, agent_name: str) -> bool:
+        """True when the agent has not been contacted within the cold-idle window."""
+        last = self._agent(agent_name).last_contact
+        return last is None or time.monotonic() - last > COLD_IDLE_S
+
+    def last_contact(self, agent_name: str) -> Optional[float]:
+        return self._agent(agent_name).last_contact
+
+    def touch(self, agent_name: str) -> None:
+        """Mark the agent as recently reached (a call or healthcheck ping)."""
+        self._agent(agent_name).last_contact = time.monotonic()
+
+    def record(self, agent_name: str, intent: str, elapsed_ms: float, cold: bool) -> None:
+        state = self._agent(agent_name)
+        window = state.cold if cold else state.intents.setdefault(intent, LatencyWindow())
+        window.add(elapsed_ms)
+        state.timeout_streaks.pop(intent, None)
+        state.last_contact = time.monotonic()
+
+    def record_timeout(self, agent_name: str, intent: str, timeout_ms: float, cold: bool) -> None:
+        """Record a call cut off at `timeout_ms` as a censored sample and back off the next timeout."""
+        state = self._agent(agent_name)
+        window = state.cold if cold else state.intents.setdefault(intent, LatencyWindow())
+        window.add(timeout_ms)
+        state.timeout_streaks[intent] = state.timeout_streaks.get(intent, 0) + 1
+
+    def effective_timeout_ms(self, agent_meta: AgentMetadata, intent: str, cold: bool) -> int:
+        """Timeout to use for the next call; the registry value is the ceiling."""
+        ceiling = agent_meta.timeout_ms
+        if cold:
+            return ceiling
+        state = self._agent(agent_meta.name)
+        window = state.intents.get(intent)
+        if window is None or len(window) < LATENCY_MIN_SAMPLES:
+            return ceiling
+        p99 = window.percentile(99) or 0.0
+        streak = min(state.timeout_streaks.get(intent, 0), 10)
+        adaptive = int(p99 * TIMEOUT_P99_FACTOR * TIMEOUT_BACKOFF ** streak)
+        return max(min(TIMEOUT_FLOOR_MS, ceiling), min(adaptive, ceiling))
+
+    def snapshot(self, agent_meta: AgentMetadata) -> Dict[str, Any]:
+        state = self._agent(agent_meta.name)
+        return {
+            "cold": self.is_cold(agent_meta.name),
+            "cold_start": state.cold.summary(),
+            "intents": {
+                intent: {
+                    **window.summary(),
+                    "timeout_ms": self.effective_timeout_ms(agent_meta, intent, cold=False),
+                    "timeout_streak": state.timeout_streaks.get(intent, 0),
+                }
+                for intent, window in state.intents.items()
+            },
+        }
+
+
+_TRACKER: Optional[LatencyTracker] = None
+
+
+def get_latency_tracker() -> LatencyTracker:
+    global _TRACKER
+    if _TRACKER is None:
+        _TRACKER = LatencyTracker()
+    return _TRACKER
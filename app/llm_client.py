@@ -0,0 +1,52 @@
+"""
+Shared async OpenRouter client for the planner and answer synthesis. One
+AsyncOpenAI instance (and so one connection pool) serves every LLM call in the
+process; because the calls are awaited on the event loop, cancelling a request
+task aborts its in-flight HTTP request instead of leaving it to finish (and be
+billed) in a worker thread. The app lifespan closes the client at shutdown.
+"""
+from __future__ import annotations
+
+import logging
+import os
+
+try:
+    from openai import AsyncOpenAI  # type: ignore
+except ImportError:
+    AsyncOpenAI = None  # optional; callers fall back to heuristics / stitched answers
+
+logger = logging.getLogger(__name__)
+
+OPENROUTER_MODEL = os.getenv("OPENROUTER_MODEL", "google/gemini-2.5-flash-lite")
+
+_CLIENT = None
+
+
+def get_openrouter_client():
+    """Return the shared async OpenRouter client, or None if unavailable."""
+    global _CLIENT
+    if _CLIENT is not None:
+        return _CLIENT
+    api_key = os.getenv("OPENROUTER_API_KEY")
+    if AsyncOpenAI is None or not api_key:
+        return None
+    try:
+        _CLIENT = AsyncOpenAI(
+            base_url="https://openrouter.ai/api/v1",
+            api_key=api_key,
+        )
+    except Exception as exc:
+        logger.error("Failed to configure OpenRouter client: %s", exc)
+        return None
+    return _CLIENT
+
+
+async def close_openrouter_client() -> None:
+    """Close the shared client at application shutdown."""
+    global _CLIENT
+    client, _CLIENT = _CLIENT, None
+    if client is not None:
+        try:
+            await client.close()
+        except Exception as exc:
+            logger.warning("Failed to close OpenRouter client: %s", exc)
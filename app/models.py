@@ -5,7 +5,7 @@ without hunting through the codebase.
 """
 from __future__ import annotations
 
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Literal, Optional
 
 from pydantic import BaseModel, Field
 
@@ -14,6 +14,8 @@ class FrontendOptions(BaseModel):
     """Flags that the UI can send along with a query."""
 
     debug: bool = False
+    # Whole-request time budget; the server default applies when omitted.
+    deadline_ms: Optional[int] = Field(default=None, ge=1000, le=600_000)
 
 
 class FileUpload(BaseModel):
@@ -86,11 +88,26 @@ class AgentMetadata(BaseModel):
     name: str
     description: str
     intents: List[str]
-    type: str  # "http" or "cli"
+    type: str  # "http", "cli" or "inproc"
     endpoint: Optional[str] = None
     command: Optional[str] = None
+    asgi_app: Optional[str] = None  # type="inproc": "package.module:app" served in-process
     healthcheck: Optional[str] = None
     timeout_ms: int = 5000
+    accepts_files: bool = False  # forward uploaded file bytes in the handshake
+    supports_file_refs: bool = False  # agent caches files by digest; skip re-sending bytes
+    cache_ttl_s: Dict[str, float] = Field(default_factory=dict)  # read intent -> response TTL
+    invalidates: Dict[str, List[str]] = Field(default_factory=dict)  # write intent -> agents to purge
+    max_concurrency: int = 8  # bulkhead: concurrent outbound calls to this agent
+    max_queue: int = 32  # bulkhead: callers allowed to wait for a slot
+    queue_timeout_ms: int = 10000  # bulkhead: max wait for a slot
+    cli_workers: int = 2  # type="cli": persistent worker processes in the pool
+    fan_out_intents: List[str] = Field(default_factory=list)  # intents run once per uploaded file
+    write_intents: List[str] = Field(default_factory=list)  # state-changing intents beyond `invalidates`
+
+    def is_write(self, intent: str) -> bool:
+        """True if the intent changes state; such plans are never reused for similar queries."""
+        return intent in self.invalidates or intent in self.write_intents
 
 
 class PlanStep(BaseModel):
@@ -98,10 +115,23 @@ class PlanStep(BaseModel):
     agent: str
     intent: str
     input_source: str  # "user_query" or "step:X.output.result"
+    # What to do when the step this one reads from did not succeed:
+    # "skip" (report as skipped, no call), "fallback" (use the user query), "run" (pass the error on).
+    on_dependency_failure: Literal["skip", "fallback", "run"] = "fallback"
 
 
 class Plan(BaseModel):
     steps: List[PlanStep]
+    rule: Optional[str] = None  # routing rule or planner tier that produced the plan; None for fresh LLM plans
+
+
+class BackgroundJob(BaseModel):
+    """Follow-up work still running after the answer was returned; poll `poll_url` for the result."""
+
+    job_id: str
+    kind: str
+    status: str
+    poll_url: str
 
 
 class SupervisorResponse(BaseModel):
@@ -109,3 +139,4 @@ class SupervisorResponse(BaseModel):
     used_agents: List[UsedAgentEntry]
     intermediate_results: Dict[str, Any]
     error: Optional[ErrorModel] = None
+    background_jobs: List[BackgroundJob] = Field(default_factory=list)
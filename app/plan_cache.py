@@ -0,0 +1,115 @@
+"""
+Exact-match cache for LLM-produced plans. Users repeat the same requests many
+times a day; when the keyword heuristics miss, the second identical query is
+answered from here instead of paying another LLM planning call.
+
+Entries are keyed by the normalized query text and a fingerprint of the
+registry (agent names and intents), expire after PLAN_CACHE_TTL_S and are
+evicted LRU beyond PLAN_CACHE_MAX_ENTRIES. When the registry fingerprint
+changes the whole cache is dropped. Callers re-validate cached steps against
+the current registry before using them.
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from .models import AgentMetadata, Plan
+from .response_cache import normalize_text
+
+PLAN_CACHE_TTL_S = float(os.getenv("SUPERVISOR_PLAN_CACHE_TTL_S", "3600"))
+PLAN_CACHE_MAX_ENTRIES = int(os.getenv("SUPERVISOR_PLAN_CACHE_MAX_ENTRIES", "1024"))
+# Shorter queries asked mid-conversation ("yes", "do that again") depend on the
+# history the LLM saw, so they are planned fresh every time.
+PLAN_CACHE_MIN_WORDS_WITH_HISTORY = 4
+
+
+def registry_fingerprint(registry: List[AgentMetadata]) -> str:
+    """Stable hash of the agents and intents a plan may reference."""
+    digest = hashlib.sha256()
+    for agent in sorted(registry, key=lambda a: a.name):
+        digest.update(agent.name.encode())
+        for intent in sorted(agent.intents):
+            digest.update(b"\0" + intent.encode())
+        digest.update(b"\n")
+    return digest.hexdigest()[:16]
+
+
+class PlanCache:
+    def __init__(self, ttl_s: float = PLAN_CACHE_TTL_S, max_entries: int = PLAN_CACHE_MAX_ENTRIES) -> None:
+        self.ttl_s = ttl_s
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, List[Dict[str, Any]]]]" = OrderedDict()
+        self._fingerprint: Optional[str] = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def cacheable(self, query: str, history: Optional[List]) -> bool:
+        return self.ttl_s > 0 and (not history or len(query.split()) >= PLAN_CACHE_MIN_WORDS_WITH_HISTORY)
+
+    def _sync_registry(self, registry: List[AgentMetadata]) -> None:
+        fingerprint = registry_fingerprint(registry)
+        if fingerprint != self._fingerprint:
+            if self._entries:
+                self.invalidations += len(self._entries)
+                self._entries.clear()
+            self._fingerprint = fingerprint
+
+    def get(self, query: str, registry: List[AgentMetadata]) -> Optional[List[Dict[str, Any]]]:
+        """Raw cached steps for `query`; the caller validates them before use."""
+        self._sync_registry(registry)
+        key = normalize_text(query)
+        item = self._entries.get(key)
+        if item is None:
+            self.misses += 1
+            return None
+        expires_at, steps = item
+        if time.monotonic() >= expires_at:
+            del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return [dict(step) for step in steps]
+
+    def put(self, query: str, registry: List[AgentMetadata], plan: Plan) -> None:
+        # Empty plans are out-of-scope answers or LLM failures; neither should stick.
+        if not plan.steps:
+            return
+        self._sync_registry(registry)
+        key = normalize_text(query)
+        self._entries[key] = (time.monotonic() + self.ttl_s, [step.model_dump() for step in plan.steps])
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def discard(self, query: str) -> None:
+        self._entries.pop(normalize_text(query), None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_s": self.ttl_s,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "registry_fingerprint": self._fingerprint,
+        }
+
+
+_CACHE: Optional[PlanCache] = None
+
+
+def get_plan_cache() -> PlanCache:
+    global _CACHE
+    if _CACHE is None:
+        _CACHE = PlanCache()
+    return _CACHE
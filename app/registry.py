@@ -32,6 +32,8 @@ def load_registry() -> List[AgentMetadata]:
             endpoint="http://5.161.59.136:8000/api/agent/execute",
             healthcheck="http://5.161.59.136:8000/health",
             timeout_ms=30000,
+            accepts_files=True,
+            fan_out_intents=["summary.create", "summarize_document", "extract_key_points", "identify_risks", "extract_action_items"],
         ),
         AgentMetadata(
             name="meeting_followup_agent",
@@ -41,6 +43,7 @@ def load_registry() -> List[AgentMetadata]:
             endpoint="https://meeting-minutes-backend-spm-production.up.railway.app/agents/supervisor/meeting-followup",
             healthcheck="https://meeting-minutes-backend-spm-production.up.railway.app/agents/supervisor/health",
             timeout_ms=30000,
+            accepts_files=True,
         ),
         AgentMetadata(
             name="onboarding_buddy_agent",
@@ -57,6 +60,9 @@ def load_registry() -> List[AgentMetadata]:
             endpoint="https://onboardingbuddyagent-production.up.railway.app/execute",
             healthcheck="https://onboardingbuddyagent-production.up.railway.app/health",
             timeout_ms=100000,
+            max_concurrency=4,  # slow worker; keep it from hogging sockets
+            max_queue=8,
+            write_intents=["onboarding.create", "onboarding.update", "employee.create", "employee.update"],
         ),
         AgentMetadata(
             name="KnowledgeBaseBuilderAgent",
@@ -66,6 +72,10 @@ def load_registry() -> List[AgentMetadata]:
             endpoint="http://vps.zaim-abbasi.tech/knowledge-builder/message",
             healthcheck="http://vps.zaim-abbasi.tech/knowledge-builder/health",
             timeout_ms=30000,
+            invalidates={
+                intent: ["deadline_guardian_agent", "task_dependency_agent"]
+                for intent in ["create_task", "add_task", "task.create", "task.add"]
+            },
         ),
         AgentMetadata(
             name="task_dependency_agent",
@@ -75,6 +85,7 @@ def load_registry() -> List[AgentMetadata]:
             endpoint="https://task-dependency-agent.vercel.app/task",
             healthcheck="https://task-dependency-agent.vercel.app/health",
             timeout_ms=30000,
+            invalidates={"task.resolve_dependencies": ["deadline_guardian_agent"]},
         ),
         AgentMetadata(
             name="progress_accountability_agent",
@@ -96,6 +107,11 @@ def load_registry() -> List[AgentMetadata]:
             endpoint="https://spm-agent-api-production.up.railway.app/agent/json",
             healthcheck="https://spm-agent-api-production.up.railway.app/health",
             timeout_ms=30000,
+            cache_ttl_s={"goal.list": 60, "productivity.report": 120},
+            invalidates={
+                intent: ["progress_accountability_agent"]
+                for intent in ["progress.track", "goal.create", "goal.update", "reflection.add", "progress.message"]
+            },
         ),
 
 
@@ -107,6 +123,7 @@ def load_registry() -> List[AgentMetadata]:
             endpoint="https://deadlinegaurdianagent-production.up.railway.app/handle",
             healthcheck="https://deadlinegaurdianagent-production.up.railway.app/health",
             timeout_ms=30000,
+            cache_ttl_s={"deadline.monitor": 60},
         ),
         AgentMetadata(
             name="focus_enforcer_agent",
@@ -118,10 +135,16 @@ def load_registry() -> List[AgentMetadata]:
                 "focus.check_status",
                 "productivity.assess"
             ],
-            type="http",
+            type="inproc",  # Served in-process; set type="http" to call a separate service on :8001
+            asgi_app="app.agents:focus_enforcer_app",
             endpoint="http://localhost:8001/handle",  # Local endpoint for Focus Enforcer service
             healthcheck="http://localhost:8001/health",
             timeout_ms=60000,  # 60 seconds timeout for LLM analysis
+            cache_ttl_s={"focus.check_status": 10},
+            invalidates={
+                "focus.start_monitoring": ["focus_enforcer_agent"],
+                "focus.stop_monitoring": ["focus_enforcer_agent"],
+            },
         ),
         AgentMetadata(
             name="budget_tracker_agent",
@@ -140,6 +163,13 @@ def load_registry() -> List[AgentMetadata]:
             endpoint="https://budget-tracker-agent.onrender.com/api/query",
             healthcheck="https://budget-tracker-agent.onrender.com/api/health",
             timeout_ms=30000,  # Increased to 30s for Render.com cold starts (docs say 5000ms but that's too short for cold starts)
+            cache_ttl_s={"budget.list": 120, "budget.report": 120},
+            # The router sends every budget query, writes included ("add expense",
+            # "update budget"), as budget.question, so it must purge cached reads too.
+            invalidates={
+                "budget.update": ["budget_tracker_agent"],
+                "budget.question": ["budget_tracker_agent"],
+            },
         ),
         AgentMetadata(
             name="hiring_screener_agent",
@@ -165,6 +195,9 @@ def load_registry() -> List[AgentMetadata]:
             endpoint=f"https://hiring-screener-agent-sre.onrender.com/supervisor/task",
             healthcheck="https://hiring-screener-agent-sre.onrender.com/health",
             timeout_ms=30000,
+            accepts_files=True,
+            # Per-resume intents only; ranking and reports get every resume in one call (metadata.files).
+            fan_out_intents=["hiring.parse_resume", "hiring.match_skills", "hiring.score_candidate", "resume.parse", "candidate.evaluate", "candidate.score"],
         ),
         # Document Reviewer Agent.
         AgentMetadata(
@@ -180,6 +213,8 @@ def load_registry() -> List[AgentMetadata]:
             endpoint="https://document-reviewer-agent.onrender.com/handle",
             healthcheck="https://document-reviewer-agent.onrender.com/health",
             timeout_ms=60000,
+            accepts_files=True,
+            fan_out_intents=["document.review", "document.review.spelling", "document.review.grammar", "document.review.compliance"],
         ),
     ]
 
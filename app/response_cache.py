@@ -0,0 +1,92 @@
+"""
+TTL cache for read-only agent intents. Registry entries opt in per intent via
+`AgentMetadata.cache_ttl_s`; write intents list the agents whose cached reads
+they make stale via `AgentMetadata.invalidates`. Entries are keyed by agent,
+intent, normalized input text and user, and evicted LRU once the cache holds
+`max_entries` responses. Hits are returned as copies with a fresh request_id.
+"""
+from __future__ import annotations
+
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from .models import AgentMetadata, AgentResponse
+
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("SUPERVISOR_RESPONSE_CACHE_MAX_ENTRIES", "512"))
+
+CacheKey = Tuple[str, str, str, str]
+
+
+def normalize_text(text: str) -> str:
+    """Case- and whitespace-insensitive form of an input used in cache keys."""
+    return " ".join(text.lower().split())
+
+
+def cache_key(agent_name: str, intent: str, text: str, user_id: Any) -> CacheKey:
+    return (agent_name, intent, normalize_text(text), str(user_id or "anonymous"))
+
+
+class ResponseCache:
+    def __init__(self, max_entries: int = RESPONSE_CACHE_MAX_ENTRIES) -> None:
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[CacheKey, Tuple[float, AgentResponse]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key: CacheKey, request_id: str) -> Optional[AgentResponse]:
+        item = self._entries.get(key)
+        if item is None:
+            self.misses += 1
+            return None
+        expires_at, response = item
+        if time.monotonic() >= expires_at:
+            del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return response.model_copy(update={"request_id": request_id}, deep=True)
+
+    def put(self, key: CacheKey, response: AgentResponse, ttl_s: float) -> None:
+        if ttl_s <= 0 or not response.is_success():
+            return
+        self._entries[key] = (time.monotonic() + ttl_s, response.model_copy(deep=True))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate_agent(self, agent_name: str) -> int:
+        stale = [key for key in self._entries if key[0] == agent_name]
+        for key in stale:
+            del self._entries[key]
+        self.invalidations += len(stale)
+        return len(stale)
+
+    def invalidate_for_write(self, agent_meta: AgentMetadata, intent: str) -> None:
+        for target in agent_meta.invalidates.get(intent, []):
+            self.invalidate_agent(target)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+_CACHE: Optional[ResponseCache] = None
+
+
+def get_response_cache() -> ResponseCache:
+    global _CACHE
+    if _CACHE is None:
+        _CACHE = ResponseCache()
+    return _CACHE
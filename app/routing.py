@@ -0,0 +1,405 @@
+"""
+Deterministic keyword routing for clear intents, ahead of the LLM planner.
+
+Rules live in one table, in priority order: the first rule whose keywords occur
+in the (lower-cased) query wins, exactly like the chain of `any(keyword in
+lower_q ...)` checks this replaces. Every keyword of every rule is compiled once
+into a single trie-shaped regex, so routing costs one scan of the query no
+matter how many rules or keywords there are, which matters when a whole pasted
+document arrives as the query.
+
+The scan uses a zero-width lookahead so matches may overlap. At each position
+the greedy trie yields the longest keyword starting there; the shorter keywords
+that are prefixes of it (and so also start there) are added from a precomputed
+prefix closure. The result is the exact set of keywords that occur as
+substrings of the query, the same answer `keyword in lower_q` gives per keyword.
+"""
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, Iterable, List, Optional, Pattern, Set, Tuple
+
+from .models import Plan, PlanStep
+
+
+@dataclass(frozen=True)
+class RoutingRule:
+    name: str
+    keywords: FrozenSet[str]
+    steps: Tuple[PlanStep, ...]
+    # Optional AND-clause: at least one of these must also occur.
+    requires: FrozenSet[str] = frozenset()
+    # Optional per-intent refinement of a single-step rule: the first
+    # (keywords, intent) pair that matches replaces the step's intent.
+    intent_selector: Tuple[Tuple[FrozenSet[str], str], ...] = ()
+
+    def matches(self, found: Set[str]) -> bool:
+        if self.keywords.isdisjoint(found):
+            return False
+        return not self.requires or not self.requires.isdisjoint(found)
+
+    def plan(self, found: Set[str]) -> Plan:
+        steps = [step.model_copy() for step in self.steps]
+        for keywords, intent in self.intent_selector:
+            if not keywords.isdisjoint(found):
+                steps[0].intent = intent
+                break
+        return Plan(steps=steps, rule=self.name)
+
+    def all_keywords(self) -> Iterable[str]:
+        yield from self.keywords
+        yield from self.requires
+        for keywords, _ in self.intent_selector:
+            yield from keywords
+
+
+def _single(agent: str, intent: str) -> Tuple[PlanStep, ...]:
+    return (PlanStep(step_id=0, agent=agent, intent=intent, input_source="user_query"),)
+
+
+def _rule(name: str, keywords: Iterable[str], steps: Tuple[PlanStep, ...], **kwargs) -> RoutingRule:
+    return RoutingRule(name=name, keywords=frozenset(keywords), steps=steps, **kwargs)
+
+
+# Budget tracking and analysis - comprehensive keyword matching
+# Note: Budget risk phrases are checked by an earlier rule, before the deadline agent
+BUDGET_KEYWORDS = [
+    # Core budget terms
+    "budget", "budgets", "budgeting", "budgeted",
+    # Spending terms
+    "spending", "spent", "spend", "spends", "spender",
+    # Expense terms
+    "expense", "expenses", "expenditure", "expenditures", "expend",
+    # Cost terms
+    "cost", "costs", "costing", "costed",
+    # Financial terms
+    "financial", "finance", "finances", "financing",
+    "money", "monetary", "funds", "funding", "funded",
+    # Allocation terms
+    "allocation", "allocate", "allocated", "allocating",
+    # Tracking/monitoring terms
+    "track", "tracking", "tracked", "tracks",
+    "monitor", "monitoring", "monitored", "monitors",
+    # Overspending terms (these catch budget risk queries)
+    "overspending", "overspend", "overspent", "over budget", "over-budget",
+    # Remaining/balance terms
+    "remaining", "remain", "remains", "balance", "balances", "left over",
+    # Limit terms
+    "limit", "limits", "limited", "limiting", "budget limit", "budget cap",
+    # Forecast/prediction terms
+    "forecast", "forecasts", "forecasting", "forecasted",
+    "predict", "predicts", "prediction", "predictions", "predicting", "predicted",
+    # Analysis terms
+    "analyze", "analyzes", "analysis", "analyses", "analyzing", "analyzed",
+    "analytics", "analytical",
+    # Report terms
+    "report", "reports", "reporting", "reported",
+    "summary", "summaries", "summarize", "summarizing", "summarized",
+    # Recommendation terms
+    "recommend", "recommends", "recommendation", "recommendations", "recommending", "recommended",
+    "suggestion", "suggestions", "suggest", "suggests", "suggesting", "suggested",
+    "advice", "advise", "advises", "advising", "advised",
+    # Anomaly terms
+    "anomaly", "anomalies", "anomalous", "unusual spending", "unusual expense",
+    # Status/check terms
+    "status", "state", "current budget", "budget status", "budget state",
+    "check budget", "budget check", "view budget", "show budget",
+    # Project budget terms
+    "project budget", "project cost", "project costs", "project spending",
+    "project expense", "project expenses", "project financial",
+    # Project listing terms
+    "projects", "project list", "list projects", "all projects", "current projects",
+    "projects and budgets", "show projects", "list all projects", "what projects",
+    "which projects", "my projects", "list of projects",
+    "all my projects", "active projects", "project overview",
+    "projects with budgets", "projects budget", "project budgets",
+    # Update/record terms
+    "update budget", "update spending", "add expense", "add spending",
+    "record expense", "log expense", "log spending", "enter expense",
+    # Question terms
+    "how much", "how much left", "how much remaining", "what's my budget",
+    "what is my budget", "budget question", "budget query",
+    # Management terms
+    "manage budget", "budget management", "control spending", "spending control",
+    "budget control", "financial management", "expense management",
+]
+
+# Priority order matters: earlier rules win, mirroring the original if-chain.
+ROUTING_RULES: List[RoutingRule] = [
+    _rule(
+        "focus_start",
+        [
+            "start focus mode", "turn on focus", "enable focus", "focus mode on",
+            "start monitoring", "start focus", "begin monitoring", "track my focus",
+            "monitor my activity", "watch my productivity",
+        ],
+        (
+            PlanStep(step_id=0, agent="deadline_guardian_agent", intent="deadline.monitor", input_source="user_query"),
+            PlanStep(
+                step_id=1,
+                agent="focus_enforcer_agent",
+                intent="focus.start_monitoring",
+                input_source="step:0.output.result",  # Pass deadline data to focus enforcer
+                # A session is still worth starting without deadline data.
+                on_dependency_failure="fallback",
+            ),
+        ),
+    ),
+    _rule(
+        "focus_analyze",
+        [
+            "focus", "distracted", "distraction", "productivity", "procrastinating",
+            "am i focused", "check my focus", "analyze focus", "focus score",
+            "how productive", "staying on task", "off task",
+        ],
+        (
+            PlanStep(step_id=0, agent="deadline_guardian_agent", intent="deadline.monitor", input_source="user_query"),
+            PlanStep(
+                step_id=1,
+                agent="focus_enforcer_agent",
+                intent="focus.analyze",
+                input_source="step:0.output.result",  # Pass deadline data
+                # The analysis is scored against deadline risk; without it the call is wasted.
+                on_dependency_failure="skip",
+            ),
+        ),
+    ),
+    # Stop focus monitoring session (no deadline needed)
+    _rule(
+        "focus_stop",
+        [
+            "stop monitoring", "stop focus", "end monitoring", "stop tracking",
+            "turn off focus", "disable focus", "focus mode off",
+        ],
+        _single("focus_enforcer_agent", "focus.stop_monitoring"),
+    ),
+    # Check focus status (no deadline needed - just status check)
+    _rule(
+        "focus_status",
+        ["focus status", "monitoring status", "is focus on", "focus running"],
+        _single("focus_enforcer_agent", "focus.check_status"),
+    ),
+    # Onboarding agent heuristics - check for all intents
+    _rule(
+        "onboarding_create",
+        [
+            "onboard", "onboarding", "new hire", "new employee",
+            "employee setup", "hire someone", "add employee",
+        ],
+        _single("onboarding_buddy_agent", "onboarding.create"),
+    ),
+    # Update employee information
+    _rule(
+        "onboarding_update",
+        ["update employee", "change employee", "modify employee", "edit employee", "update onboarding"],
+        _single("onboarding_buddy_agent", "onboarding.update"),
+    ),
+    # Check employee progress/status
+    _rule(
+        "onboarding_progress",
+        [
+            "employee progress", "onboarding progress", "employee status",
+            "check employee", "employee completion", "profile completion",
+            "onboarding status",
+        ],
+        _single("onboarding_buddy_agent", "onboarding.check_progress"),
+    ),
+    # Task creation heuristics
+    _rule(
+        "task_create",
+        ["create task", "new task", "add task", "task:", "i need to", "implement", "fix bug"],
+        _single("KnowledgeBaseBuilderAgent", "create_task"),
+    ),
+    # Check for summarization BEFORE deadline/risk to avoid misrouting
+    _rule(
+        "summary",
+        ["summary", "summarize", "condense"],
+        _single("document_summarizer_agent", "summary.create"),
+    ),
+    # Budget risk queries - check BEFORE deadline to catch budget-related "risk" queries
+    # This prevents "risks for overspending" from going to deadline_guardian_agent
+    _rule(
+        "budget_risk",
+        [
+            "overspending risk", "budget risk", "financial risk", "spending risk",
+            "risks for overspending", "risk of overspending", "overspending risks",
+            "budget risks", "financial risks", "spending risks",
+            "analyze risk", "analyze risks", "risks for", "risk for",
+        ],
+        _single("budget_tracker_agent", "budget.question"),
+        requires=frozenset(["overspending", "spending", "budget", "financial", "expense", "cost"]),
+    ),
+    # Deadline monitoring
+    _rule(
+        "deadline",
+        ["deadline", "due date", "risk", "slip"],
+        _single("deadline_guardian_agent", "deadline.monitor"),
+    ),
+    # Meeting follow-up
+    _rule(
+        "meeting_followup",
+        ["follow-up", "followup", "action item", "minutes"],
+        _single("meeting_followup_agent", "meeting.followup"),
+    ),
+    # Task dependencies
+    _rule(
+        "task_dependencies",
+        ["dependency", "depends on", "blocked by", "analyze dependencies"],
+        _single("task_dependency_agent", "task.resolve_dependencies"),
+    ),
+    # Email priority
+    _rule(
+        "email_priority",
+        ["email", "inbox", "priority"],
+        _single("email_priority_agent", "email.prioritize"),
+    ),
+    # Progress accountability agent – track general progress
+    _rule(
+        "progress_track",
+        ["progress", "task status"],
+        _single("progress_accountability_agent", "progress.track"),
+    ),
+    # Budget tracker handles intent detection internally; budget.question is the default.
+    _rule(
+        "budget",
+        BUDGET_KEYWORDS,
+        _single("budget_tracker_agent", "budget.question"),
+    ),
+    # Productivity agent – detailed routing
+    _rule(
+        "goal_create",
+        ["create goal", "new goal", "add goal"],
+        _single("progress_accountability_agent", "goal.create"),
+    ),
+    _rule(
+        "goal_update",
+        ["update goal", "goal progress", "progress update"],
+        _single("progress_accountability_agent", "goal.update"),
+    ),
+    # Add reflection / journaling
+    _rule(
+        "reflection",
+        ["add reflection", "journal", "daily log", "reflection", "wrote"],
+        _single("progress_accountability_agent", "reflection.add"),
+    ),
+    _rule(
+        "insights",
+        ["insight"],
+        _single("progress_accountability_agent", "productivity.insights"),
+    ),
+    _rule(
+        "accountability",
+        ["accountability"],
+        _single("progress_accountability_agent", "productivity.accountability"),
+    ),
+    # General analysis
+    _rule(
+        "analysis",
+        ["analysis", "analyze", "trend", "pattern"],
+        _single("progress_accountability_agent", "productivity.analyze"),
+    ),
+    # Report generation
+    _rule(
+        "report",
+        ["report"],
+        _single("progress_accountability_agent", "productivity.report"),
+    ),
+    # Document review detection
+    _rule(
+        "document_review",
+        [
+            "review document", "check spelling", "grammar check", "compliance check",
+            "proofread", "docx", "document review", "review",
+        ],
+        _single("document_reviewer_agent", "document.review"),
+    ),
+    # Hiring/Resume operations - comprehensive keywords
+    _rule(
+        "hiring",
+        [
+            "resume", "cv", "parse resume", "extract skills",
+            "candidate", "applicant", "job application",
+            "hire", "hiring", "recruit", "screening",
+            "match skill", "skill match", "evaluate candidate",
+            "score candidate", "rank candidate", "compare candidate",
+            "bias", "fairness", "discrimination",
+            "hiring report", "recruitment report",
+        ],
+        _single("hiring_screener_agent", "hiring.match_skills"),  # Default to skill matching
+        intent_selector=(
+            (frozenset(["parse", "extract", "cv", "resume text"]), "hiring.parse_resume"),
+            (frozenset(["match", "skill", "requirement", "job description"]), "hiring.match_skills"),
+            (frozenset(["score", "evaluate", "assess", "rate"]), "hiring.score_candidate"),
+            (frozenset(["rank", "compare", "multiple candidate", "best candidate"]), "hiring.rank_candidates"),
+            (frozenset(["bias", "fair", "discrimination", "equity"]), "hiring.check_bias"),
+            (frozenset(["report", "summary", "analysis"]), "hiring.generate_report"),
+        ),
+    ),
+]
+
+
+def _trie_pattern(words: Iterable[str]) -> str:
+    """Regex source for a trie over `words` whose greedy match is the longest word at a position."""
+    trie: Dict[str, dict] = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def emit(node: Dict[str, dict]) -> str:
+        branches = [re.escape(ch) + emit(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        # A word ends here but longer ones continue: try the longer ones first.
+        return f"(?:{body})?" if "" in node else body
+
+    return emit(trie)
+
+
+class KeywordRouter:
+    """Compiled form of a rules table: one regex plus a prefix closure per keyword."""
+
+    def __init__(self, rules: List[RoutingRule]) -> None:
+        self.rules = rules
+        keywords = sorted({kw for rule in rules for kw in rule.all_keywords()})
+        self._pattern: Pattern[str] = re.compile(f"(?=({_trie_pattern(keywords)}))")
+        keyword_set = set(keywords)
+        # Keywords that are prefixes of a keyword start wherever it starts.
+        self._closure: Dict[str, FrozenSet[str]] = {
+            kw: frozenset(kw[:i] for i in range(1, len(kw) + 1) if kw[:i] in keyword_set)
+            for kw in keywords
+        }
+
+    def keywords_in(self, lower_q: str) -> Set[str]:
+        """Every table keyword occurring in `lower_q`, found in a single scan."""
+        found: Set[str] = set()
+        for match in self._pattern.finditer(lower_q):
+            found |= self._closure[match.group(1)]
+        return found
+
+    def route(self, query: str) -> Optional[Plan]:
+        """Plan from the highest-priority matching rule, or None when no rule applies."""
+        found = self.keywords_in(query.lower())
+        if not found:
+            return None
+        for rule in self.rules:
+            if rule.matches(found):
+                return rule.plan(found)
+        return None
+
+
+_ROUTER: Optional[KeywordRouter] = None
+
+
+def get_router() -> KeywordRouter:
+    global _ROUTER
+    if _ROUTER is None:
+        _ROUTER = KeywordRouter(ROUTING_RULES)
+    return _ROUTER
+
+
+def route_query(query: str) -> Optional[Plan]:
+    return get_router().route(query)
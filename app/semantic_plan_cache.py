@@ -0,0 +1,249 @@
+"""
+Similarity cache for LLM plans. Many planner queries are paraphrases of earlier
+ones ("what are my deadlines" / "show me my upcoming deadlines"); a query whose
+hashed n-gram vector (app.text_features) has cosine similarity of at least
+SEMANTIC_CACHE_THRESHOLD with a previously planned query reuses that plan
+instead of calling the LLM. Everything is local: one matrix-vector product over
+at most SEMANTIC_CACHE_MAX_ENTRIES rows.
+
+The index is tied to a registry fingerprint and is cleared when the agents or
+intents change. The app lifespan loads it from SEMANTIC_CACHE_PATH at startup
+and saves it in a worker thread at shutdown (an empty path disables
+persistence), so the planner never writes to disk on the request path. Entries
+keep only a short digest of their query, never the raw text, which may be a
+pasted document or contain personal data.
+
+Similarity alone cannot tell "set up the account for John" from "show me the
+account for John" when the shared tail dominates, so two guards apply: plans
+containing a write intent (`AgentMetadata.is_write`) are never indexed or
+served, and a hit also needs the query's leading verb (its first word after
+fillers like "please" / "can you") to match the cached one.
+Without NumPy the cache is inert.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from .models import AgentMetadata, Plan
+from .plan_cache import registry_fingerprint
+from .response_cache import normalize_text
+from .text_features import FEATURE_DIM, NUMPY_AVAILABLE, featurize, np
+
+logger = logging.getLogger(__name__)
+
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SUPERVISOR_SEMANTIC_CACHE_THRESHOLD", "0.9"))
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SUPERVISOR_SEMANTIC_CACHE_MAX_ENTRIES", "1000"))
+SEMANTIC_CACHE_PATH = os.getenv("SUPERVISOR_SEMANTIC_CACHE_PATH", ".supervisor_cache/semantic_plans.npz")
+# Bumped when the persisted layout changes; older files are rebuilt from scratch.
+SEMANTIC_CACHE_FORMAT = 3
+# Queries this similar to an indexed one replace it instead of adding a row.
+DUPLICATE_SIMILARITY = 0.99
+# Politeness and request framing skipped when finding a query's leading verb.
+LEAD_FILLERS = frozenset(
+    "please pls kindly hey hi hello can could would will you u i we id i'd want wanna need like to just me us".split()
+)
+
+
+class SemanticPlanCache:
+    def __init__(
+        self,
+        threshold: float = SEMANTIC_CACHE_THRESHOLD,
+        max_entries: int = SEMANTIC_CACHE_MAX_ENTRIES,
+        path: str = SEMANTIC_CACHE_PATH,
+        dim: int = FEATURE_DIM,
+    ) -> None:
+        self.enabled = NUMPY_AVAILABLE and max_entries > 0
+        self.threshold = threshold
+        self.max_entries = max(1, max_entries)
+        self.path = path
+        self.dim = dim
+        self._fingerprint: Optional[str] = None
+        self._keys: List[str] = []  # query digests, for logs and persistence
+        self._leads: List[str] = []  # leading verb of each query
+        self._steps: List[List[Dict[str, Any]]] = []
+        self._last_used: List[float] = []
+        self._vectors = np.zeros((0, dim), dtype=np.float32) if NUMPY_AVAILABLE else None
+        self._unsaved = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    # -- registry / persistence -------------------------------------------
+
+    def _sync_registry(self, registry: List[AgentMetadata]) -> None:
+        fingerprint = registry_fingerprint(registry)
+        if fingerprint == self._fingerprint:
+            return
+        if self._keys:
+            logger.info("Registry changed; dropping %d semantic plan cache entries", len(self._keys))
+            self.invalidations += len(self._keys)
+            self._clear()
+        self._fingerprint = fingerprint
+
+    def _clear(self) -> None:
+        self._keys, self._leads, self._steps, self._last_used = [], [], [], []
+        self._vectors = np.zeros((0, self.dim), dtype=np.float32)
+        self._unsaved += 1
+
+    def load(self, registry: List[AgentMetadata]) -> None:
+        """Load the persisted index, ignoring it if it was built for another registry or feature size."""
+        if not self.enabled or not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with np.load(self.path, allow_pickle=False) as data:
+                meta = json.loads(str(data["meta"]))
+                vectors = data["vectors"].astype(np.float32)
+        except Exception as exc:
+            logger.warning("Could not load semantic plan cache from %s: %s", self.path, exc)
+            return
+        if (
+            meta.get("format") != SEMANTIC_CACHE_FORMAT
+            or meta.get("fingerprint") != registry_fingerprint(registry)
+            or vectors.shape[1:] != (self.dim,)
+        ):
+            logger.info("Semantic plan cache at %s is stale; rebuilding from scratch", self.path)
+            return
+        entries = meta.get("entries", [])[-self.max_entries:]
+        self._fingerprint = meta["fingerprint"]
+        self._keys = [entry["key"] for entry in entries]
+        self._leads = [entry["lead"] for entry in entries]
+        self._steps = [entry["steps"] for entry in entries]
+        self._last_used = [0.0] * len(entries)
+        self._vectors = vectors[-len(entries):] if entries else vectors[:0]
+        logger.info("Loaded %d semantic plan cache entries from %s", len(entries), self.path)
+
+    def save(self) -> None:
+        """Write the index to `path`; blocking, so async callers run it via asyncio.to_thread."""
+        if not self.enabled or not self.path or not self._unsaved:
+            return
+        meta = {
+            "format": SEMANTIC_CACHE_FORMAT,
+            "fingerprint": self._fingerprint,
+            "entries": [
+                {"key": k, "lead": lead, "steps": s} for k, lead, s in zip(self._keys, self._leads, self._steps)
+            ],
+        }
+        directory = os.path.dirname(self.path)
+        tmp_path = f"{self.path}.tmp.npz"
+        try:
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            np.savez_compressed(tmp_path, vectors=self._vectors, meta=np.array(json.dumps(meta)))
+            os.replace(tmp_path, self.path)
+            self._unsaved = 0
+        except Exception as exc:
+            logger.warning("Could not save semantic plan cache to %s: %s", self.path, exc)
+
+    # -- lookup / insert ----------------------------------------------------
+
+    def _nearest(self, vector, lead: str) -> Tuple[int, float]:
+        """Most similar entry among those sharing the query's leading verb."""
+        if not self._keys:
+            return -1, 0.0
+        similarities = self._vectors @ vector
+        similarities[np.array(self._leads) != lead] = -1.0
+        index = int(np.argmax(similarities))
+        if similarities[index] < 0:
+            return -1, 0.0
+        return index, float(similarities[index])
+
+    def get(self, query: str, registry: List[AgentMetadata]) -> Optional[Tuple[List[Dict[str, Any]], float]]:
+        """Raw steps of the most similar cached query and its similarity, if above the threshold."""
+        if not self.enabled:
+            return None
+        self._sync_registry(registry)
+        index, similarity = self._nearest(featurize(query, self.dim), leading_verb(query))
+        if index < 0 or similarity < self.threshold or _writes(self._steps[index], registry):
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._last_used[index] = time.monotonic()
+        logger.info("Semantic plan cache hit (%.3f) for %r via entry %s", similarity, query[:80], self._keys[index])
+        return [dict(step) for step in self._steps[index]], similarity
+
+    def put(self, query: str, registry: List[AgentMetadata], plan: Plan) -> None:
+        if not self.enabled or not plan.steps:
+            return
+        steps = [step.model_dump() for step in plan.steps]
+        if _writes(steps, registry):
+            # A near-miss query must never replay a create/update.
+            return
+        self._sync_registry(registry)
+        vector = featurize(query, self.dim)
+        if not vector.any():
+            return
+        lead = leading_verb(query)
+        index, similarity = self._nearest(vector, lead)
+        key = _query_key(query)
+        if index >= 0 and similarity >= DUPLICATE_SIMILARITY:
+            self._keys[index], self._steps[index] = key, steps
+            self._vectors[index] = vector
+            self._last_used[index] = time.monotonic()
+        else:
+            if len(self._keys) >= self.max_entries:
+                self._evict_lru()
+            self._keys.append(key)
+            self._leads.append(lead)
+            self._steps.append(steps)
+            self._last_used.append(time.monotonic())
+            self._vectors = np.vstack([self._vectors, vector[None, :]])
+        self._unsaved += 1
+
+    def _evict_lru(self) -> None:
+        self._remove(min(range(len(self._last_used)), key=self._last_used.__getitem__))
+        self.evictions += 1
+
+    def _remove(self, index: int) -> None:
+        del self._keys[index], self._leads[index], self._steps[index], self._last_used[index]
+        self._vectors = np.delete(self._vectors, index, axis=0)
+        self._unsaved += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._keys),
+            "max_entries": self.max_entries,
+            "threshold": self.threshold,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "path": self.path or None,
+        }
+
+
+def _query_key(query: str) -> str:
+    return hashlib.sha256(normalize_text(query).encode()).hexdigest()[:16]
+
+
+def leading_verb(query: str) -> str:
+    """First word of the query after politeness/request fillers ("" if there is none)."""
+    for word in normalize_text(query).split():
+        word = word.strip(".,!?;:'\"")
+        if word and word not in LEAD_FILLERS:
+            return word
+    return ""
+
+
+def _writes(steps: List[Dict[str, Any]], registry: List[AgentMetadata]) -> bool:
+    agents = {agent.name: agent for agent in registry}
+    return any(
+        step.get("agent") in agents and agents[step["agent"]].is_write(step.get("intent", ""))
+        for step in steps
+    )
+
+
+_CACHE: Optional[SemanticPlanCache] = None
+
+
+def get_semantic_plan_cache() -> SemanticPlanCache:
+    global _CACHE
+    if _CACHE is None:
+        _CACHE = SemanticPlanCache()
+    return _CACHE
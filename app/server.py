@@ -4,11 +4,13 @@ and health. The heavy lifting lives in other modules to keep concerns separated.
 """
 from __future__ import annotations
 
+import asyncio
 import uuid
+from contextlib import asynccontextmanager
 from datetime import datetime, timezone
-from typing import Dict
+from typing import Any, Dict
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Response
 import logging
 
 logger = logging.getLogger(__name__)
@@ -19,22 +21,95 @@ except ImportError:
     httpx = None
 
 from .answer import compose_final_answer
+from .bulkhead import bulkhead_stats
+from .circuit_breaker import get_breaker
+from .cli_pool import cli_pool_stats, close_cli_pools
+from .codec import BACKEND as JSON_CODEC_BACKEND, CodecJSONResponse
 from .conversation import append_turn, get_history
+from .deadline import Deadline
 from .executor import execute_plan
 from .general import handle_general_query
-from .file_utils import normalize_file_uploads
+from .file_utils import normalize_file_uploads, store_file_uploads
+from .http_pool import close_client_pool, get_client_pool, open_client_pool
+from .intent_classifier import get_intent_classifier, load_intent_classifier
+from .jobs import get_job_registry
+from .latency import get_latency_tracker
+from .llm_client import close_openrouter_client
+from .upload_store import get_upload_store
 from .models import FrontendRequest, SupervisorResponse
+from .plan_cache import get_plan_cache
 from .planner import plan_tools_with_llm
 from .registry import load_registry
+from .response_cache import get_response_cache
+from .semantic_plan_cache import get_semantic_plan_cache
+from .single_flight import get_single_flight
+from .task_dependencies import (
+    TASKS_URL,
+    describe_dependency_steps,
+    get_dependency_debouncer,
+    schedule_dependency_followups,
+)
+from .warmer import get_warmer
 from .web import render_home, render_agents_page, render_query_page, render_tasks_page
-from .models import AgentResponse
+
+# How often a running query checks whether its client is still connected.
+DISCONNECT_POLL_S = 0.25
+# nginx's "client closed request"; nobody reads it, but it keeps access logs honest.
+CLIENT_CLOSED_REQUEST = 499
+
+
+def _respond(response: SupervisorResponse) -> CodecJSONResponse:
+    """Serialize through the fast codec, skipping FastAPI's jsonable_encoder pass."""
+    return CodecJSONResponse(response.model_dump())
+
+
+async def _await_unless_disconnected(request: Request, task: asyncio.Task) -> bool:
+    """
+    Wait for `task` while polling the client connection. Returns False after
+    cancelling the task (and waiting for its cleanup) if the client went away.
+    """
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_S)
+            if done:
+                return True
+            if await request.is_disconnected():
+                break
+    except BaseException:
+        task.cancel()
+        raise
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+    return False
 
 
 def build_app() -> FastAPI:
     # Basic logging setup for planner debugging; in production replace with structured logging.
     if not logging.getLogger().handlers:
         logging.basicConfig(level=logging.INFO)
-    app = FastAPI(title="Supervisor Agent Demo")
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        # Outbound connections to worker hosts live for the whole process.
+        await open_client_pool()
+        semantic_plans = get_semantic_plan_cache()
+        semantic_plans.load(load_registry())
+        load_intent_classifier(load_registry())
+        warmer = get_warmer()
+        warmer.start()
+        try:
+            yield
+        finally:
+            await warmer.stop()
+            await get_job_registry().aclose()
+            await close_cli_pools()
+            await close_openrouter_client()
+            await asyncio.to_thread(semantic_plans.save)
+            await close_client_pool()
+
+    app = FastAPI(title="Supervisor Agent Demo", lifespan=lifespan)
+    # Queries abandoned by their client, keyed by the phase they were cancelled in.
+    cancellations: Dict[str, int] = {"planning": 0, "agents": 0, "answer": 0}
 
     @app.get("/")
     async def home():
@@ -54,21 +129,24 @@ def build_app() -> FastAPI:
 
     @app.get("/api/agents")
     async def list_agents():
-        return [agent.dict() for agent in load_registry()]
+        return [
+            {**agent.model_dump(), "circuit": get_breaker(agent).snapshot()}
+            for agent in load_registry()
+        ]
 
     @app.get("/api/tasks")
     async def list_tasks():
         if httpx is None:
             raise HTTPException(status_code=503, detail="httpx not installed to fetch tasks")
         try:
-            async with httpx.AsyncClient(timeout=15) as client:
-                resp = await client.get("http://vps.zaim-abbasi.tech/knowledge-builder/tasks")
-                resp.raise_for_status()
-                data = resp.json()
-                tasks = data.get("tasks") if isinstance(data, dict) else data
-                if not isinstance(tasks, list):
-                    tasks = []
-                return {"tasks": tasks, "count": len(tasks), "status": data.get("status") if isinstance(data, dict) else None}
+            client = get_client_pool().client_for(TASKS_URL)
+            resp = await client.get(TASKS_URL, timeout=15)
+            resp.raise_for_status()
+            data = resp.json()
+            tasks = data.get("tasks") if isinstance(data, dict) else data
+            if not isinstance(tasks, list):
+                tasks = []
+            return {"tasks": tasks, "count": len(tasks), "status": data.get("status") if isinstance(data, dict) else None}
         except httpx.HTTPStatusError as exc:
             logger.error("Tasks fetch failed with status %s", exc.response.status_code)
             raise HTTPException(status_code=502, detail="Failed to fetch tasks from knowledge base")
@@ -76,11 +154,24 @@ def build_app() -> FastAPI:
             logger.error("Tasks fetch failed: %s", exc)
             raise HTTPException(status_code=502, detail="Failed to fetch tasks from knowledge base")
 
-    @app.post("/api/query", response_model=SupervisorResponse)
-    async def handle_query(payload: FrontendRequest) -> SupervisorResponse:
+    @app.post("/api/query", response_model=SupervisorResponse, response_class=CodecJSONResponse)
+    async def handle_query(payload: FrontendRequest, request: Request) -> SupervisorResponse:
         if not payload.query.strip():
             raise HTTPException(status_code=400, detail="Query cannot be empty")
 
+        # Run the pipeline as its own task so a closed tab or a superseding
+        # message cancels planning, in-flight agent calls and answer synthesis.
+        progress = {"phase": "planning"}
+        pipeline = asyncio.create_task(run_query(payload, progress))
+        if await _await_unless_disconnected(request, pipeline):
+            return pipeline.result()
+        cancellations[progress["phase"]] += 1
+        logger.info("Client disconnected during %s; query cancelled", progress["phase"])
+        return Response(status_code=CLIENT_CLOSED_REQUEST)
+
+    async def run_query(payload: FrontendRequest, progress: Dict[str, str]) -> CodecJSONResponse:
+        get_warmer().note_traffic()
+        deadline = Deadline(payload.options.deadline_ms)
         registry = load_registry()
         conversation_id = payload.conversation_id or str(uuid.uuid4())
         history = get_history(conversation_id)
@@ -99,122 +190,101 @@ def build_app() -> FastAPI:
             ]
         
         query_text, file_uploads = normalize_file_uploads(structured_uploads, payload.query)
-        
-        # Debug: Log file uploads if present
-        if file_uploads:
-            logger.info(f"File uploads detected: {len(file_uploads)} file(s)")
-            for i, fu in enumerate(file_uploads):
-                logger.info(f"  File {i+1}: {fu.get('filename', 'unknown')} ({fu.get('mime_type', 'unknown')}), size: {len(fu.get('base64_data', ''))} chars")
-
-        general = handle_general_query(query_text)
-        if general["kind"] in {"blocked", "general"}:
-            answer = general["answer"] or ""
-            intermediate_results: Dict[str, str] = {}
+        # Decode once into the content-addressed store; downstream code only sees references.
+        # Uploads stay pinned in the store until this request is done with them.
+        file_refs = store_file_uploads(file_uploads)
+        try:
+            # Debug: Log file uploads if present
+            if file_refs:
+                logger.info(f"File uploads detected: {len(file_refs)} file(s)")
+                for i, ref in enumerate(file_refs):
+                    logger.info(f"  File {i+1}: {ref['filename']} ({ref['mime_type']}), size: {ref['size']} bytes, {ref['digest'][:19]}")
+
+            general = handle_general_query(query_text)
+            if general["kind"] in {"blocked", "general"}:
+                answer = general["answer"] or ""
+                intermediate_results: Dict[str, str] = {}
+                append_turn(conversation_id, "user", payload.query)
+                append_turn(conversation_id, "assistant", answer)
+                return _respond(SupervisorResponse(
+                    answer=answer,
+                    used_agents=[],
+                    intermediate_results=intermediate_results,
+                    error=None,
+                ))
+
+            plan = await plan_tools_with_llm(query_text, registry, history=history, timeout_s=deadline.planning_timeout_s())
+            # Wake sleeping workers for later chain steps while earlier steps run.
+            get_warmer().warm_plan(plan, registry)
+
+            # Normalize context values to strings to satisfy downstream agents.
+            context = {
+                "user_id": str(payload.user_id) if payload.user_id is not None else "anonymous",
+                "conversation_id": conversation_id,
+                "timestamp": datetime.now(timezone.utc).isoformat(),
+                "file_uploads": file_refs,  # References into the upload store
+            }
+
+            progress["phase"] = "agents"
+            step_outputs, used_agents = await execute_plan(query_text, plan, registry, context, deadline=deadline)
+            # TDA steps in the plan itself answer this request, so name their tasks now.
+            await describe_dependency_steps(step_outputs, timeout_s=deadline.step_budget_ms() / 1000)
+            # Dependency resolution after task creation runs off the critical path.
+            background_jobs = schedule_dependency_followups(plan, step_outputs, registry, context)
+
+            progress["phase"] = "answer"
+            # Awaited on the shared async client, so a disconnect aborts the LLM call.
+            answer = await compose_final_answer(
+                payload.query, step_outputs, history=history, timeout_s=deadline.answer_timeout_s()
+            )
+
+            intermediate_results = {f"step_{sid}": step_outputs[sid].model_dump() for sid in step_outputs}
+
             append_turn(conversation_id, "user", payload.query)
             append_turn(conversation_id, "assistant", answer)
-            return SupervisorResponse(
+
+            return _respond(SupervisorResponse(
                 answer=answer,
-                used_agents=[],
+                used_agents=used_agents,
                 intermediate_results=intermediate_results,
                 error=None,
-            )
-
-        plan = plan_tools_with_llm(query_text, registry, history=history)
-
-        # Normalize context values to strings to satisfy downstream agents.
-        context = {
-            "user_id": str(payload.user_id) if payload.user_id is not None else "anonymous",
-            "conversation_id": conversation_id,
-            "timestamp": datetime.now(timezone.utc).isoformat(),
-            "file_uploads": file_uploads,  # Pass file uploads to executor
+                background_jobs=[job.summary() for job in background_jobs],
+            ))
+        finally:
+            get_upload_store().release(ref["digest"] for ref in file_refs)
+
+    @app.get("/api/jobs/{job_id}")
+    async def get_job(job_id: str) -> Dict[str, Any]:
+        job = get_job_registry().get(job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail="Unknown or expired job")
+        return CodecJSONResponse(job.to_dict())
+
+    @app.get("/api/metrics")
+    async def metrics() -> Dict[str, Any]:
+        metrics_payload: Dict[str, Any] = {
+            "json_codec": JSON_CODEC_BACKEND,
+            "upload_store": get_upload_store().stats(),
         }
-
-        step_outputs, used_agents = await execute_plan(query_text, plan, registry, context)
-        # Post-process task dependency output to produce user-friendly names instead of raw JSON.
-        async def summarize_dependencies(step_outputs_map: Dict[int, AgentResponse]) -> None:
-            dep_responses = [
-                resp for resp in step_outputs_map.values()
-                if resp.agent_name == "task_dependency_agent" and resp.is_success() and resp.output and isinstance(resp.output.result, dict)
-            ]
-            if not dep_responses:
-                return
-            if httpx is None:
-                # cannot fetch task names; leave as-is
-                return
-            try:
-                async with httpx.AsyncClient(timeout=15) as client:
-                    resp = await client.get("http://vps.zaim-abbasi.tech/knowledge-builder/tasks")
-                    resp.raise_for_status()
-                    data = resp.json()
-                    tasks = data.get("tasks") if isinstance(data, dict) else data
-                    if not isinstance(tasks, list):
-                        tasks = []
-            except Exception:
-                return
-
-            task_name_map = {}
-            for task in tasks:
-                tid = str(task.get("task_id") or task.get("_id") or task.get("id") or "")
-                if tid:
-                    task_name_map[tid] = task.get("task_name") or task.get("title") or f"Task {tid}"
-
-            for dep_resp in dep_responses:
-                result = dep_resp.output.result or {}
-                execution_order = result.get("execution_order") or []
-                dependencies = result.get("dependencies") or {}
-                exec_names = []
-                for tid in execution_order:
-                    name = task_name_map.get(str(tid))
-                    if name:
-                        exec_names.append(name)
-                dep_names = []
-                if isinstance(dependencies, dict):
-                    for tid, deps in dependencies.items():
-                        if deps:
-                            name = task_name_map.get(str(tid))
-                            if name:
-                                dep_names.append(name)
-                # deduplicate while preserving order
-                def uniq(seq):
-                    seen = set()
-                    out = []
-                    for item in seq:
-                        if item in seen:
-                            continue
-                        seen.add(item)
-                        out.append(item)
-                    return out
-                exec_names = uniq(exec_names)
-                dep_names = uniq(dep_names)
-
-                lines = []
-                if exec_names:
-                    lines.append("Execution order tasks:")
-                    for name in exec_names:
-                        lines.append(f"- {name}")
-                if dep_names:
-                    lines.append("Tasks with dependencies:")
-                    for name in dep_names:
-                        lines.append(f"- {name}")
-                if not lines:
-                    lines.append("No task names could be resolved for dependencies.")
-                dep_resp.output.result = "\n".join(lines)
-
-        await summarize_dependencies(step_outputs)
-
-        answer = compose_final_answer(payload.query, step_outputs, history=history)
-
-        intermediate_results = {f"step_{sid}": step_outputs[sid].dict() for sid in step_outputs}
-
-        append_turn(conversation_id, "user", payload.query)
-        append_turn(conversation_id, "assistant", answer)
-
-        return SupervisorResponse(
-            answer=answer,
-            used_agents=used_agents,
-            intermediate_results=intermediate_results,
-            error=None,
-        )
+        if httpx is not None:
+            metrics_payload["http_pool"] = get_client_pool().stats()
+        tracker = get_latency_tracker()
+        metrics_payload["agent_latency"] = {
+            agent.name: tracker.snapshot(agent) for agent in load_registry()
+        }
+        metrics_payload["warmer"] = get_warmer().stats()
+        metrics_payload["response_cache"] = get_response_cache().stats()
+        metrics_payload["plan_cache"] = get_plan_cache().stats()
+        metrics_payload["semantic_plan_cache"] = get_semantic_plan_cache().stats()
+        classifier = get_intent_classifier()
+        metrics_payload["intent_classifier"] = classifier.stats() if classifier is not None else None
+        metrics_payload["single_flight"] = get_single_flight().stats()
+        metrics_payload["bulkheads"] = bulkhead_stats()
+        metrics_payload["cli_pools"] = cli_pool_stats()
+        metrics_payload["jobs"] = get_job_registry().stats()
+        metrics_payload["dependency_followups"] = get_dependency_debouncer().stats()
+        metrics_payload["cancelled_queries"] = {"total": sum(cancellations.values()), **cancellations}
+        return metrics_payload
 
     @app.get("/health")
     async def health() -> Dict[str, str]:
@@ -0,0 +1,104 @@
+"""
+Single-flight coalescing for identical concurrent agent calls. The first caller
+for a key starts the real call; callers that arrive while it is in flight await
+the same task. Every caller receives its own deep copy of the AgentResponse with
+its own request_id, so later per-request post-processing cannot leak between
+requests. Waiters are reference-counted: one caller going away leaves the shared
+call running for the others, but when the last waiter is cancelled (e.g. every
+client disconnected) the underlying call is cancelled too.
+
+Outcomes that describe the leader rather than the agent are not shared: when
+the leader ran out of its own request budget (`deadline_exceeded`) or its call
+was cancelled, each follower runs the call again under its own budget.
+"""
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+from .models import AgentResponse
+
+# Error types that reflect the leading caller's budget, not the agent's answer.
+UNSHARED_ERROR_TYPES = {"deadline_exceeded"}
+
+
+class SingleFlight:
+    def __init__(self) -> None:
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+        self._waiters: Dict[asyncio.Future, int] = {}
+        self.leaders = 0
+        self.coalesced = 0
+        self.abandoned = 0
+        self.retried = 0
+
+    async def do(
+        self,
+        key: Hashable,
+        fn: Callable[[], Awaitable[AgentResponse]],
+        request_id: str,
+    ) -> AgentResponse:
+        task = self._calls.get(key)
+        leader = task is None
+        if leader:
+            self.leaders += 1
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda done, k=key: self._forget(k, done))
+        else:
+            self.coalesced += 1
+        self._waiters[task] = self._waiters.get(task, 0) + 1
+        try:
+            # wait() never cancels what it waits on, so one caller being
+            # cancelled does not cancel the shared call.
+            await asyncio.wait({task})
+        except asyncio.CancelledError:
+            if self._waiters.get(task) == 1 and not task.done():
+                self.abandoned += 1
+                # Unpublish first so a late arrival starts a fresh call.
+                self._forget(key, task)
+                task.cancel()
+            raise
+        finally:
+            remaining = self._waiters.get(task, 1) - 1
+            if remaining:
+                self._waiters[task] = remaining
+            else:
+                self._waiters.pop(task, None)
+        if not leader and not self._shareable(task):
+            self.retried += 1
+            self._forget(key, task)
+            return await self.do(key, fn, request_id)
+        response = task.result()
+        return response.model_copy(update={"request_id": request_id}, deep=True)
+
+    @staticmethod
+    def _shareable(task: asyncio.Future) -> bool:
+        if task.cancelled():
+            return False
+        if task.exception() is not None:
+            return True
+        error = task.result().error
+        return not (error and error.type in UNSHARED_ERROR_TYPES)
+
+    def _forget(self, key: Hashable, task: asyncio.Future) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "in_flight": len(self._calls),
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+            "abandoned": self.abandoned,
+            "retried": self.retried,
+        }
+
+
+_FLIGHTS: Optional[SingleFlight] = None
+
+
+def get_single_flight() -> SingleFlight:
+    global _FLIGHTS
+    if _FLIGHTS is None:
+        _FLIGHTS = SingleFlight()
+    return _FLIGHTS
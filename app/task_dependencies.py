@@ -0,0 +1,233 @@
+"""
+Task-dependency follow-up. After KnowledgeBaseBuilderAgent creates a task the
+task_dependency_agent re-reads every task from the knowledge base and infers
+the execution order. That takes two remote round trips (the agent call plus a
+task-list fetch to turn ids into names), so it runs as a background job: the
+user gets the create-task answer immediately and the dependency summary is
+picked up later from `/api/jobs/{job_id}`. Plans that call the
+task_dependency_agent directly still get their ids rewritten into task names
+before the answer is composed.
+
+Each run re-reads every task and re-infers dependencies with an LLM, so
+triggers are debounced: all create_task steps of a request, and of any other
+request arriving within the quiet window, share a single run that starts once
+no new trigger has arrived for DEPENDENCY_DEBOUNCE_S (capped at
+DEPENDENCY_DEBOUNCE_MAX_S after the first trigger).
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+try:
+    import httpx  # type: ignore
+except ImportError:
+    httpx = None
+
+from .agent_caller import call_agent
+from .http_pool import get_client_pool
+from .jobs import Job, get_job_registry
+from .models import AgentMetadata, AgentResponse, Plan
+from .registry import find_agent_by_name
+
+logger = logging.getLogger(__name__)
+
+TASKS_URL = "http://vps.zaim-abbasi.tech/knowledge-builder/tasks"
+TASKS_FETCH_TIMEOUT_S = 15
+JOB_KIND = "task.resolve_dependencies"
+DEPENDENCY_DEBOUNCE_S = float(os.getenv("SUPERVISOR_DEPENDENCY_DEBOUNCE_S", "2"))
+DEPENDENCY_DEBOUNCE_MAX_S = float(os.getenv("SUPERVISOR_DEPENDENCY_DEBOUNCE_MAX_S", "10"))
+
+
+def dependency_triggers(plan: Plan, step_outputs: Dict[int, AgentResponse]) -> int:
+    """Count successful KnowledgeBaseBuilderAgent create_task steps in an executed plan."""
+    return sum(
+        1
+        for step in plan.steps
+        if step.agent == "KnowledgeBaseBuilderAgent"
+        and step.intent == "create_task"
+        and step_outputs.get(step.step_id) is not None
+        and step_outputs[step.step_id].status == "success"
+    )
+
+
+class DependencyDebouncer:
+    """Collapse bursts of create_task triggers into one dependency-resolution job."""
+
+    def __init__(self, quiet_s: float = DEPENDENCY_DEBOUNCE_S, max_wait_s: float = DEPENDENCY_DEBOUNCE_MAX_S) -> None:
+        self.quiet_s = quiet_s
+        self.max_wait_s = max(quiet_s, max_wait_s)
+        self._open: Optional[Job] = None
+        self._first_trigger = 0.0
+        self._last_trigger = 0.0
+        self.triggers = 0
+        self.runs = 0
+
+    def trigger(self, tda_meta: AgentMetadata, context: Dict[str, Any], count: int = 1) -> Job:
+        """Join the job still collecting triggers, or open a new one."""
+        now = time.monotonic()
+        self.triggers += count
+        self._last_trigger = now
+        if self._open is not None and not self._open.done:
+            return self._open
+        self._first_trigger = now
+        self.runs += 1
+        job = get_job_registry().submit(JOB_KIND, lambda: self._run_when_quiet(tda_meta, context))
+        self._open = job
+        return job
+
+    async def _run_when_quiet(self, tda_meta: AgentMetadata, context: Dict[str, Any]) -> AgentResponse:
+        try:
+            while True:
+                now = time.monotonic()
+                wait = min(self._last_trigger + self.quiet_s, self._first_trigger + self.max_wait_s) - now
+                if wait <= 0:
+                    break
+                await asyncio.sleep(wait)
+        finally:
+            # From here on the run reads the task list; later triggers need a fresh run.
+            self._open = None
+        return await resolve_dependencies(tda_meta, context)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "triggers": self.triggers,
+            "runs": self.runs,
+            "coalesced": self.triggers - self.runs,
+            "collecting": self._open is not None,
+        }
+
+
+_DEBOUNCER: Optional[DependencyDebouncer] = None
+
+
+def get_dependency_debouncer() -> DependencyDebouncer:
+    global _DEBOUNCER
+    if _DEBOUNCER is None:
+        _DEBOUNCER = DependencyDebouncer()
+    return _DEBOUNCER
+
+
+def schedule_dependency_followups(
+    plan: Plan,
+    step_outputs: Dict[int, AgentResponse],
+    registry: List[AgentMetadata],
+    context: Dict[str, Any],
+) -> List[Job]:
+    """Schedule (or join) the debounced dependency resolution for an executed plan."""
+    triggers = dependency_triggers(plan, step_outputs)
+    if not triggers:
+        return []
+    try:
+        tda_meta = find_agent_by_name("task_dependency_agent", registry)
+    except KeyError:
+        # TDA not found in registry, skip auto-trigger
+        return []
+    # TDA reads every task from the database, so one run serves all triggers.
+    return [get_dependency_debouncer().trigger(tda_meta, context, count=triggers)]
+
+
+async def resolve_dependencies(tda_meta: AgentMetadata, context: Dict[str, Any]) -> AgentResponse:
+    """Call TDA with the database trigger and rewrite its reply into task names."""
+    # Call TDA with database trigger - it will retrieve tasks from MongoDB
+    response = await call_agent(
+        tda_meta,
+        "task.resolve_dependencies",
+        "",  # Empty text since TDA uses trigger
+        context,
+        custom_input={"trigger": "database_update"},  # Signal to retrieve from DB
+    )
+    if response.is_success() and isinstance(response.output.result, dict):
+        await describe_dependencies(response)
+    return response
+
+
+async def fetch_tasks(timeout_s: float = TASKS_FETCH_TIMEOUT_S) -> Optional[List[Dict[str, Any]]]:
+    """Fetch the knowledge-base task list, or None when it is unavailable."""
+    if httpx is None or timeout_s <= 0:
+        return None
+    try:
+        client = get_client_pool().client_for(TASKS_URL)
+        resp = await client.get(TASKS_URL, timeout=min(TASKS_FETCH_TIMEOUT_S, timeout_s))
+        resp.raise_for_status()
+        data = resp.json()
+    except Exception as exc:
+        logger.info("Task list fetch failed: %s", exc)
+        return None
+    tasks = data.get("tasks") if isinstance(data, dict) else data
+    return tasks if isinstance(tasks, list) else []
+
+
+async def describe_dependency_steps(
+    step_outputs: Dict[int, AgentResponse], timeout_s: float = TASKS_FETCH_TIMEOUT_S
+) -> None:
+    """Rewrite task_dependency_agent steps of an executed plan into task names, in place.
+
+    Plans that call TDA directly ("what is the dependency order of my tasks")
+    need this before the answer is composed; one task-list fetch serves every step.
+    """
+    dep_responses = [
+        resp for resp in step_outputs.values()
+        if resp.agent_name == "task_dependency_agent" and resp.is_success() and resp.output and isinstance(resp.output.result, dict)
+    ]
+    if not dep_responses:
+        return
+    tasks = await fetch_tasks(timeout_s)
+    if tasks is None:
+        # cannot fetch task names (or no time left to); leave as-is
+        return
+    for dep_resp in dep_responses:
+        name_dependencies(dep_resp, tasks)
+
+
+async def describe_dependencies(dep_resp: AgentResponse) -> None:
+    """Replace TDA's raw id-based result with user-friendly task names, in place."""
+    tasks = await fetch_tasks()
+    if tasks is None:
+        # cannot fetch task names; leave as-is
+        return
+    name_dependencies(dep_resp, tasks)
+
+
+def name_dependencies(dep_resp: AgentResponse, tasks: List[Dict[str, Any]]) -> None:
+    """Rewrite TDA's id-based result into task names using a fetched task list."""
+    task_name_map = {}
+    for task in tasks:
+        tid = str(task.get("task_id") or task.get("_id") or task.get("id") or "")
+        if tid:
+            task_name_map[tid] = task.get("task_name") or task.get("title") or f"Task {tid}"
+
+    result = dep_resp.output.result or {}
+    execution_order = result.get("execution_order") or []
+    dependencies = result.get("dependencies") or {}
+    exec_names = []
+    for tid in execution_order:
+        name = task_name_map.get(str(tid))
+        if name:
+            exec_names.append(name)
+    dep_names = []
+    if isinstance(dependencies, dict):
+        for tid, deps in dependencies.items():
+            if deps:
+                name = task_name_map.get(str(tid))
+                if name:
+                    dep_names.append(name)
+    # deduplicate while preserving order
+    exec_names = list(dict.fromkeys(exec_names))
+    dep_names = list(dict.fromkeys(dep_names))
+
+    lines = []
+    if exec_names:
+        lines.append("Execution order tasks:")
+        for name in exec_names:
+            lines.append(f"- {name}")
+    if dep_names:
+        lines.append("Tasks with dependencies:")
+        for name in dep_names:
+            lines.append(f"- {name}")
+    if not lines:
+        lines.append("No task names could be resolved for dependencies.")
+    dep_resp.output.result = "\n".join(lines)
@@ -0,0 +1,63 @@
+"""
+Hashed text features shared by the local planner tiers (semantic plan cache,
+intent classifier). Text is normalized, split into character n-grams (within
+word boundaries, so paraphrases sharing stems overlap) plus whole words, and
+each token is hashed with CRC32 into a fixed number of buckets. Vectors are
+log-scaled and L2-normalized, so a dot product is a cosine similarity.
+
+CRC32 rather than `hash()` keeps bucket indices stable across processes, which
+persisted indexes and trained models depend on. NumPy is optional: callers
+check NUMPY_AVAILABLE and disable their tier when it is missing.
+"""
+from __future__ import annotations
+
+import os
+import zlib
+from typing import Iterable, List
+
+try:
+    import numpy as np  # type: ignore
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+    NUMPY_AVAILABLE = False
+
+from .response_cache import normalize_text
+
+FEATURE_DIM = int(os.getenv("SUPERVISOR_TEXT_FEATURE_DIM", "2048"))
+NGRAM_MIN = 3
+NGRAM_MAX = 5
+# Pasted documents are not planner phrasing; their head carries the intent.
+FEATURE_MAX_CHARS = 2000
+
+
+def tokens(text: str) -> List[str]:
+    """Words and their padded character n-grams for `text`."""
+    words = normalize_text(text[:FEATURE_MAX_CHARS]).split()
+    out: List[str] = []
+    for word in words:
+        out.append(f"w:{word}")
+        padded = f" {word} "
+        for n in range(NGRAM_MIN, NGRAM_MAX + 1):
+            out.extend(padded[i:i + n] for i in range(len(padded) - n + 1))
+    return out
+
+
+def bucket_ids(text: str, dim: int = FEATURE_DIM) -> List[int]:
+    return [zlib.crc32(token.encode()) % dim for token in tokens(text)]
+
+
+def featurize(text: str, dim: int = FEATURE_DIM):
+    """L2-normalized float32 vector of length `dim` (all zeros for empty text)."""
+    counts = np.bincount(np.asarray(bucket_ids(text, dim), dtype=np.int64), minlength=dim)
+    vector = np.log1p(counts.astype(np.float32))
+    norm = float(np.linalg.norm(vector))
+    return vector / norm if norm else vector
+
+
+def featurize_many(texts: Iterable[str], dim: int = FEATURE_DIM):
+    """Stack of featurize() rows, shape (len(texts), dim)."""
+    rows = [featurize(text, dim) for text in texts]
+    if not rows:
+        return np.zeros((0, dim), dtype=np.float32)
+    return np.vstack(rows)
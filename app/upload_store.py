@@ -0,0 +1,173 @@
+"""
+Content-addressed store for uploaded files. Uploads are decoded once, keyed by
+their sha256 digest, and kept under an LRU policy bounded by total bytes and
+entry count. Handshakes then carry a small file reference; the raw bytes are
+only attached for agents that have not already received that digest.
+
+A request pins its uploads for as long as it runs (`pin`/`release`, counted per
+digest), and eviction skips pinned entries, so concurrent uploads cannot evict
+a file between `store_file_uploads` and the agent call that needs it.
+
+Like the conversation history this is per-process and in-memory; swap for a
+shared blob store when running multiple supervisor instances.
+"""
+from __future__ import annotations
+
+import base64
+import binascii
+import hashlib
+import logging
+import os
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_STORE_MAX_BYTES = int(os.getenv("SUPERVISOR_UPLOAD_STORE_MAX_BYTES", str(200 * 1024 * 1024)))
+UPLOAD_STORE_MAX_ENTRIES = int(os.getenv("SUPERVISOR_UPLOAD_STORE_MAX_ENTRIES", "64"))
+
+
+class UploadMissing(LookupError):
+    """A referenced upload is no longer in the store."""
+
+
+@dataclass
+class StoredUpload:
+    digest: str
+    data: bytes
+    filename: str
+    mime_type: str
+
+    @property
+    def size(self) -> int:
+        return len(self.data)
+
+    def ref(self) -> Dict[str, Any]:
+        """Lightweight descriptor that is safe to place in context/metadata."""
+        return {
+            "digest": self.digest,
+            "filename": self.filename,
+            "mime_type": self.mime_type,
+            "size": self.size,
+        }
+
+    def base64(self) -> str:
+        return base64.b64encode(self.data).decode("ascii")
+
+
+class UploadStore:
+    """LRU, size-bounded mapping of sha256 digest -> decoded upload."""
+
+    def __init__(self, max_bytes: int = UPLOAD_STORE_MAX_BYTES, max_entries: int = UPLOAD_STORE_MAX_ENTRIES) -> None:
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[str, StoredUpload]" = OrderedDict()
+        # digest -> number of in-flight requests using it; never evicted while > 0.
+        self._pins: Dict[str, int] = {}
+        # (agent_name, digest) pairs whose bytes an agent has already accepted.
+        self._delivered: Set[Tuple[str, str]] = set()
+
+    def put(self, base64_data: str, filename: str, mime_type: str, pin: bool = False) -> StoredUpload:
+        """
+        Decode and store an upload, returning the stored entry. With `pin`,
+        the entry is pinned before anything else can be evicted for it.
+
+        Raises:
+            ValueError: If the payload is not valid base64.
+        """
+        try:
+            data = base64.b64decode(base64_data, validate=False)
+        except (binascii.Error, ValueError) as exc:
+            raise ValueError(f"Invalid base64 upload '{filename}': {exc}") from exc
+        digest = "sha256:" + hashlib.sha256(data).hexdigest()
+
+        existing = self._entries.get(digest)
+        if existing is not None:
+            self.hits += 1
+            self._entries.move_to_end(digest)
+            # Keep the latest user-facing name; the bytes are identical.
+            existing.filename = filename
+            existing.mime_type = mime_type
+            if pin:
+                self.pin([digest])
+            return existing
+
+        self.misses += 1
+        entry = StoredUpload(digest=digest, data=data, filename=filename, mime_type=mime_type)
+        self._entries[digest] = entry
+        self.total_bytes += entry.size
+        if pin:
+            self.pin([digest])
+        self._evict()
+        return entry
+
+    def pin(self, digests: Iterable[str]) -> None:
+        for digest in digests:
+            self._pins[digest] = self._pins.get(digest, 0) + 1
+
+    def release(self, digests: Iterable[str]) -> None:
+        """Drop one pin per digest and evict anything the pins were holding over the limits."""
+        for digest in digests:
+            count = self._pins.get(digest, 0) - 1
+            if count > 0:
+                self._pins[digest] = count
+            else:
+                self._pins.pop(digest, None)
+        self._evict()
+
+    def get(self, digest: str) -> Optional[StoredUpload]:
+        entry = self._entries.get(digest)
+        if entry is not None:
+            self._entries.move_to_end(digest)
+        return entry
+
+    def was_delivered(self, agent_name: str, digest: str) -> bool:
+        return (agent_name, digest) in self._delivered
+
+    def mark_delivered(self, agent_name: str, digest: str) -> None:
+        if digest in self._entries:
+            self._delivered.add((agent_name, digest))
+
+    def _evict(self) -> None:
+        # Always keep the newest entry, even if it alone exceeds the byte cap,
+        # and every pinned entry, even if together they exceed both caps.
+        while len(self._entries) > 1 and (
+            self.total_bytes > self.max_bytes or len(self._entries) > self.max_entries
+        ):
+            newest = next(reversed(self._entries))
+            digest = next((d for d in self._entries if d not in self._pins and d != newest), None)
+            if digest is None:
+                return
+            entry = self._entries.pop(digest)
+            self.total_bytes -= entry.size
+            self.evictions += 1
+            self._delivered = {pair for pair in self._delivered if pair[1] != digest}
+            logger.info("Evicted upload %s (%s, %d bytes)", digest[:19], entry.filename, entry.size)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "total_bytes": self.total_bytes,
+            "max_bytes": self.max_bytes,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "pinned": len(self._pins),
+        }
+
+
+_STORE: Optional[UploadStore] = None
+
+
+def get_upload_store() -> UploadStore:
+    """Return the process-wide upload store."""
+    global _STORE
+    if _STORE is None:
+        _STORE = UploadStore()
+    return _STORE
@@ -0,0 +1,147 @@
+"""
+Background warm-up for worker agents on hosts that sleep when idle. While the
+supervisor is seeing traffic, a periodic loop pings the registry `healthcheck`
+of every agent that has not been contacted recently. Planned chains are also
+warmed as soon as a plan exists: agents of steps that wait on an earlier step
+are pinged right away so they are awake by the time the executor reaches them.
+
+Pings update the latency tracker's last-contact time, so calls that follow a
+successful warm-up are classified (and reported) as warm rather than cold.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional, Set
+
+from .agent_caller import probe_health
+from .circuit_breaker import OPEN, get_breaker
+from .latency import LatencyWindow, get_latency_tracker
+from .models import AgentMetadata, Plan
+from .registry import find_agent_by_name, load_registry
+
+logger = logging.getLogger(__name__)
+
+WARMER_ENABLED = os.getenv("SUPERVISOR_WARMER_ENABLED", "1").lower() in {"1", "true", "yes"}
+WARMER_INTERVAL_S = float(os.getenv("SUPERVISOR_WARMER_INTERVAL_S", "240"))
+WARMER_TRAFFIC_WINDOW_S = float(os.getenv("SUPERVISOR_WARMER_TRAFFIC_WINDOW_S", "900"))
+WARM_MIN_IDLE_S = float(os.getenv("SUPERVISOR_WARM_MIN_IDLE_S", "60"))
+
+
+class AgentWarmer:
+    def __init__(
+        self,
+        interval_s: float = WARMER_INTERVAL_S,
+        traffic_window_s: float = WARMER_TRAFFIC_WINDOW_S,
+        min_idle_s: float = WARM_MIN_IDLE_S,
+    ) -> None:
+        self.interval_s = interval_s
+        self.traffic_window_s = traffic_window_s
+        self.min_idle_s = min_idle_s
+        self._last_traffic: Optional[float] = None
+        self._last_ping: Dict[str, float] = {}
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._loop_task: Optional[asyncio.Task] = None
+        self.ping_latency: Dict[str, LatencyWindow] = {}
+        self.ping_failures: Dict[str, int] = {}
+
+    def note_traffic(self) -> None:
+        self._last_traffic = time.monotonic()
+
+    def _has_traffic(self) -> bool:
+        return self._last_traffic is not None and time.monotonic() - self._last_traffic <= self.traffic_window_s
+
+    def start(self) -> None:
+        if not WARMER_ENABLED:
+            return
+        if self._loop_task is None or self._loop_task.done():
+            self._loop_task = asyncio.create_task(self._run(), name="agent-warmer")
+
+    async def stop(self) -> None:
+        tasks = [t for t in [self._loop_task, *self._inflight.values()] if t is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._loop_task = None
+        self._inflight.clear()
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval_s)
+            if not self._has_traffic():
+                continue
+            try:
+                for agent_meta in load_registry():
+                    self.warm(agent_meta, min_idle_s=self.interval_s)
+            except Exception as exc:  # never let the loop die
+                logger.warning("Agent warmer tick failed: %s", exc)
+
+    def warm(self, agent_meta: AgentMetadata, min_idle_s: Optional[float] = None) -> bool:
+        """Schedule a healthcheck ping unless the agent was reached recently. Returns True if scheduled."""
+        if not WARMER_ENABLED or not agent_meta.healthcheck or agent_meta.name in self._inflight:
+            return False
+        if agent_meta.type == "inproc":
+            return False  # in-process apps never sleep
+        if get_breaker(agent_meta).state == OPEN:
+            return False  # the breaker owns recovery probing
+        idle_limit = self.min_idle_s if min_idle_s is None else min_idle_s
+        now = time.monotonic()
+        last_contact = get_latency_tracker().last_contact(agent_meta.name)
+        recent = max(filter(None, [last_contact, self._last_ping.get(agent_meta.name)]), default=None)
+        if recent is not None and now - recent < idle_limit:
+            return False
+        self._last_ping[agent_meta.name] = now
+        task = asyncio.create_task(self._ping(agent_meta), name=f"warm-{agent_meta.name}")
+        self._inflight[agent_meta.name] = task
+        task.add_done_callback(lambda _t, name=agent_meta.name: self._inflight.pop(name, None))
+        return True
+
+    def warm_plan(self, plan: Plan, registry: List[AgentMetadata]) -> List[str]:
+        """Warm agents of steps that will only run after an earlier step finishes."""
+        immediate: Set[str] = {s.agent for s in plan.steps if not s.input_source.startswith("step:")}
+        warmed: List[str] = []
+        for step in plan.steps:
+            if step.agent in immediate or step.agent in warmed:
+                continue
+            try:
+                agent_meta = find_agent_by_name(step.agent, registry)
+            except KeyError:
+                continue
+            if self.warm(agent_meta):
+                warmed.append(step.agent)
+        if warmed:
+            logger.info("Pre-warming downstream agents: %s", ", ".join(warmed))
+        return warmed
+
+    async def _ping(self, agent_meta: AgentMetadata) -> None:
+        started = time.perf_counter()
+        healthy = await probe_health(agent_meta)
+        if healthy:
+            get_latency_tracker().touch(agent_meta.name)
+            self.ping_latency.setdefault(agent_meta.name, LatencyWindow()).add(
+                (time.perf_counter() - started) * 1000
+            )
+        else:
+            self.ping_failures[agent_meta.name] = self.ping_failures.get(agent_meta.name, 0) + 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": WARMER_ENABLED,
+            "running": self._loop_task is not None and not self._loop_task.done(),
+            "has_traffic": self._has_traffic(),
+            "in_flight": sorted(self._inflight),
+            "pings": {name: window.summary() for name, window in self.ping_latency.items()},
+            "ping_failures": dict(self.ping_failures),
+        }
+
+
+_WARMER: Optional[AgentWarmer] = None
+
+
+def get_warmer() -> AgentWarmer:
+    global _WARMER
+    if _WARMER is None:
+        _WARMER = AgentWarmer()
+    return _WARMER
@@ -343,6 +343,9 @@ STYLES = """
           .planet:hover { transform: translateY(-2px); box-shadow: 0 12px 34px rgba(0,0,0,0.4); }
           .planet h4 { margin: 0; font-size: 13px; color: #fff; text-align: center; }
           .planet p { display: none; }
+          .planet .circuit { display: block; margin-top: 4px; font-size: 11px; text-align: center; color: var(--muted); }
+          .planet .circuit.open { color: #fca5a5; }
+          .planet .circuit.half_open { color: #fcd34d; }
           .pill { display: inline-flex; padding: 4px 10px; border-radius: 999px; background: rgba(34,211,238,0.12); color: var(--text); font-size: 12px; border: 1px solid rgba(34,211,238,0.2); margin-right: 6px; margin-top: 4px; }
 
           /* Debug dock */
@@ -389,6 +392,7 @@ STYLES = """
           .dot { width: 10px; height: 10px; border-radius: 50%; }
           .dot.success { background: var(--success); box-shadow: 0 0 12px rgba(34,197,94,0.35); }
           .dot.error { background: var(--error); box-shadow: 0 0 12px rgba(239,68,68,0.35); }
+          .dot.skipped { background: var(--muted); }
           .mono { font-family: ui-monospace, SFMono-Regular, Menlo, monospace; font-size: 13px; }
           .json-box {
             background: #0d1524; padding: 10px; border-radius: 10px;
@@ -405,16 +409,22 @@ COMMON_REACT = """
 
           const PlanetCard = ({ agent, style }) => {
             const tooltip = `${agent.description || ''}` + (agent.intents?.length ? `\nIntents: ${agent.intents.join(', ')}` : '');
+            const circuit = agent.circuit;
             return (
               <div className="planet" style={style} title={tooltip}>
                 <h4>{agent.name}</h4>
+                {circuit && circuit.state !== 'closed' && (
+                  <span className={`circuit ${circuit.state}`} title={circuit.last_error || ''}>
+                    {circuit.state === 'open' ? `unavailable · retry in ${Math.ceil(circuit.retry_after_s)}s` : 'recovering'}
+                  </span>
+                )}
               </div>
             );
           };
 
           const TimelineItem = ({ item, index }) => (
             <div className="timeline-item">
-              <span className={`dot ${item.status === 'success' ? 'success' : 'error'}`}></span>
+              <span className={`dot ${item.status === 'success' ? 'success' : item.status === 'skipped' ? 'skipped' : 'error'}`}></span>
               <div>
                 <div style={{ display: 'flex', gap: 8, alignItems: 'center' }}>
                   <strong>{item.name}</strong>
@@ -509,6 +519,7 @@ def render_home() -> HTMLResponse:
             const [uploadedFiles, setUploadedFiles] = useState([]);
             const chatRef = React.useRef(null);
             const fileInputRef = React.useRef(null);
+            const inFlightRef = React.useRef(null);
 
             useEffect(() => {
               if (chatRef.current) {
@@ -546,6 +557,27 @@ def render_home() -> HTMLResponse:
               setUploadedFiles([]);
             };
 
+            // Follow-up jobs (e.g. task dependency resolution) finish after the answer; post their result when ready.
+            const pollJob = (job, attempt = 0) => {
+              if (attempt > 90) return;
+              setTimeout(async () => {
+                try {
+                  const resp = await fetch(job.poll_url);
+                  if (!resp.ok) return;
+                  const data = await resp.json();
+                  if (data.status === 'pending' || data.status === 'running') {
+                    pollJob(job, attempt + 1);
+                    return;
+                  }
+                  if (data.status === 'succeeded' && data.result && data.result.output) {
+                    setMessages((prev) => [...prev, { role: 'assistant', content: String(data.result.output.result) }]);
+                  }
+                } catch (err) {
+                  pollJob(job, attempt + 1);
+                }
+              }, 2000);
+            };
+
             const handleSend = async () => {
               if (!input.trim()) return;
               const userMsg = { role: 'user', content: input };
@@ -558,6 +590,11 @@ def render_home() -> HTMLResponse:
 
               const fileUploads = [...uploadedFiles];
 
+              // A new message supersedes the previous one; aborting lets the server cancel its work.
+              if (inFlightRef.current) inFlightRef.current.abort();
+              const controller = new AbortController();
+              inFlightRef.current = controller;
+
               try {
                 const requestBody = {
                   query: userMsg.content,
@@ -573,7 +610,8 @@ def render_home() -> HTMLResponse:
                 const resp = await fetch('/api/query', {
                   method: 'POST',
                   headers: { 'Content-Type': 'application/json' },
-                  body: JSON.stringify(requestBody)
+                  body: JSON.stringify(requestBody),
+                  signal: controller.signal
                 });
                 const data = await resp.json();
                 setStatus('');
@@ -581,12 +619,16 @@ def render_home() -> HTMLResponse:
                 setIntermediate(data.intermediate_results || {});
                 setError(data.error);
                 setMessages((prev) => [...prev, { role: 'assistant', content: data.answer || 'No answer produced.' }]);
+                (data.background_jobs || []).forEach((job) => pollJob(job));
                 setUploadedFiles([]);
                 setFileName('');
               } catch (err) {
+                if (err.name === 'AbortError') return;
                 setStatus('');
                 setError({ message: 'Network error', type: 'network_error' });
                 setMessages((prev) => [...prev, { role: 'assistant', content: 'Sorry, I could not reach the server.' }]);
+              } finally {
+                if (inFlightRef.current === controller) inFlightRef.current = null;
               }
             };
 
@@ -761,11 +803,21 @@ def render_agents_page(agents: List[AgentMetadata]) -> HTMLResponse:
     script_template = """
           const initialAgents = __AGENTS_JSON__;
           const App = () => {
+            const [agents, setAgents] = React.useState(initialAgents);
+
+            React.useEffect(() => {
+              // Refresh circuit breaker state so unavailable agents show up live.
+              const load = () => fetch('/api/agents').then((r) => r.json()).then(setAgents).catch(() => {});
+              load();
+              const timer = setInterval(load, 10000);
+              return () => clearInterval(timer);
+            }, []);
+
             const orbitPositions = React.useMemo(() => {
               const rings = [28, 36, 44, 52];
               const items = [];
-              const count = Math.max(initialAgents.length, 8);
-              initialAgents.forEach((agent, i) => {
+              const count = Math.max(agents.length, 8);
+              agents.forEach((agent, i) => {
                 const ringIndex = i % rings.length;
                 const angle = (i * (360 / count)) % 360;
                 const r = rings[ringIndex];
@@ -776,7 +828,7 @@ def render_agents_page(agents: List[AgentMetadata]) -> HTMLResponse:
                 items.push({ agent, style: { left: `${clampedX}%`, top: `${clampedY}%` } });
               });
               return items;
-            }, []);
+            }, [agents]);
 
             return (
               <div className="panel">
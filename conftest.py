@@ -0,0 +1 @@
+# Puts the repository root on sys.path so `pytest` can import the `app` package.
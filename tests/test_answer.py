@@ -0,0 +1,45 @@
+import asyncio
+from types import SimpleNamespace
+
+from app import answer
+from app.models import AgentResponse, OutputModel
+
+
+class _HangingCompletions:
+    def __init__(self) -> None:
+        self.started = asyncio.Event()
+        self.cancelled = False
+
+    async def create(self, **kwargs):
+        self.started.set()
+        try:
+            await asyncio.sleep(60)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+
+
+def _outputs():
+    return {0: AgentResponse(request_id="r", agent_name="a", status="success", output=OutputModel(result="done"))}
+
+
+def test_cancelling_answer_aborts_the_llm_request(monkeypatch):
+    async def run():
+        completions = _HangingCompletions()
+        client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+        monkeypatch.setattr(answer, "get_openrouter_client", lambda: client)
+        task = asyncio.ensure_future(answer.compose_final_answer("what happened?", _outputs()))
+        await completions.started.wait()
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        return completions.cancelled
+
+    assert asyncio.run(run())
+
+
+def test_answer_falls_back_to_stitched_results_without_llm(monkeypatch):
+    monkeypatch.setattr(answer, "get_openrouter_client", lambda: None)
+    assert asyncio.run(answer.compose_final_answer("what happened?", _outputs())) == "done"
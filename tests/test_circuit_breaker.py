@@ -0,0 +1,54 @@
+import asyncio
+
+from app.circuit_breaker import HALF_OPEN, CircuitBreaker
+from app.models import AgentResponse, ErrorModel
+
+
+def _failure() -> AgentResponse:
+    return AgentResponse(request_id="r", agent_name="a", status="error", error=ErrorModel(type="network_error", message="down"))
+
+
+def _half_open_breaker() -> CircuitBreaker:
+    breaker = CircuitBreaker("probe_agent", failure_threshold=1, reset_timeout_s=0)
+    breaker.record(_failure())
+    assert breaker.state == HALF_OPEN
+    return breaker
+
+
+def test_cancelled_probe_releases_the_trial():
+    breaker = _half_open_breaker()
+
+    async def slow_probe():
+        await asyncio.sleep(1)
+        return True
+
+    async def healthy_probe():
+        return True
+
+    async def run():
+        try:
+            await asyncio.wait_for(breaker.allow(slow_probe), 0.05)
+        except asyncio.TimeoutError:
+            pass
+        return await breaker.allow(healthy_probe)
+
+    assert asyncio.run(run()) is True
+
+
+def test_only_one_caller_owns_the_half_open_trial():
+    breaker = _half_open_breaker()
+
+    async def run():
+        gate = asyncio.Event()
+
+        async def probe():
+            await gate.wait()
+            return True
+
+        first = asyncio.ensure_future(breaker.allow(probe))
+        await asyncio.sleep(0)
+        second = await breaker.allow(probe)
+        gate.set()
+        return await first, second
+
+    assert asyncio.run(run()) == (True, False)
@@ -0,0 +1,20 @@
+from app.deadline import ANSWER_RESERVE_MS, Deadline
+from app.models import FrontendOptions
+from app.registry import load_registry
+
+
+def test_smallest_accepted_deadline_still_lets_steps_run():
+    smallest = FrontendOptions.model_fields["deadline_ms"].metadata[0].ge
+    deadline = Deadline(smallest)
+    assert deadline.step_budget_ms() > 0
+    assert deadline.answer_timeout_s() > 0
+
+
+def test_step_budget_keeps_answer_reserve():
+    deadline = Deadline(60000)
+    assert 0 < deadline.step_budget_ms() <= 60000 - ANSWER_RESERVE_MS
+
+
+def test_default_budget_covers_slowest_agent():
+    slowest = max(agent.timeout_ms for agent in load_registry())
+    assert Deadline().step_budget_ms() >= slowest
@@ -0,0 +1,49 @@
+import asyncio
+import time
+
+import httpx
+
+from app import agent_caller
+from app.latency import LatencyTracker
+from app.models import AgentMetadata
+
+
+async def _slow_app(scope, receive, send):
+    if scope["type"] != "http":
+        return
+    await receive()
+    await asyncio.sleep(3)
+    body = b'{"request_id":"r","agent_name":"inproc_slow_agent","status":"success","output":{"result":"late"}}'
+    await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"application/json")]})
+    await send({"type": "http.response.body", "body": body})
+
+
+def test_inproc_agent_is_cut_off_at_its_timeout(monkeypatch):
+    meta = AgentMetadata(
+        name="inproc_slow_agent",
+        description="test agent",
+        intents=["slow.read"],
+        type="inproc",
+        asgi_app="tests.slow:app",
+        endpoint="http://inproc.test/handle",
+        timeout_ms=500,
+    )
+    tracker = LatencyTracker()
+    monkeypatch.setattr(agent_caller, "get_latency_tracker", lambda: tracker)
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=_slow_app)) as client:
+            async def client_for(agent_meta, url):
+                return client
+
+            monkeypatch.setattr(agent_caller, "_client_for", client_for)
+            started = time.perf_counter()
+            response = await agent_caller.call_agent(meta, "slow.read", "hi", {})
+            return response, time.perf_counter() - started
+
+    response, elapsed = asyncio.run(run())
+
+    assert elapsed < 1.5
+    assert response.status == "error" and response.error.type == "network_error"
+    assert "Timed out after 500 ms" in response.error.message
+    assert tracker.snapshot(meta)["cold_start"]["samples"] == 1  # recorded as a censored sample
@@ -0,0 +1,150 @@
+import asyncio
+import json
+
+from app import intent_classifier, planner
+from app.intent_classifier import (
+    OUT_OF_SCOPE,
+    IntentClassifier,
+    accuracy,
+    decision_entry,
+    load_intent_classifier,
+    plan_signature,
+    seed_examples,
+    train,
+    write_decision,
+)
+from app.models import Plan, PlanStep
+from app.plan_cache import registry_fingerprint
+from app.registry import load_registry
+from app.routing import route_query
+
+DEADLINES = plan_signature([PlanStep(step_id=0, agent="deadline_guardian_agent", intent="deadline.monitor", input_source="user_query")])
+BUDGET = plan_signature([PlanStep(step_id=0, agent="budget_tracker_agent", intent="budget.question", input_source="user_query")])
+
+EXAMPLES = [
+    ("what is due this week", DEADLINES),
+    ("anything due soon for me", DEADLINES),
+    ("which tasks are due tomorrow", DEADLINES),
+    ("how much money is left", BUDGET),
+    ("how much did we spend this month", BUDGET),
+    ("what is the remaining money for marketing", BUDGET),
+    ("tell me a joke", OUT_OF_SCOPE),
+    ("write a poem about the sea", OUT_OF_SCOPE),
+    ("who won the game last night", OUT_OF_SCOPE),
+]
+
+
+def _model() -> IntentClassifier:
+    return train(EXAMPLES, dim=512, epochs=300)
+
+
+def test_seed_labels_match_the_router():
+    for text, label in seed_examples():
+        routed = route_query(text)
+        if label == OUT_OF_SCOPE:
+            assert routed is None, text
+        else:
+            assert plan_signature(routed.steps) == label, text
+
+
+def test_seed_only_model_fits_the_router():
+    seeds = seed_examples()
+    model = train(seeds, dim=1024)
+    assert accuracy(model, seeds) >= 0.95
+    # Unrelated requests defer to the LLM instead of landing on some agent.
+    for query in ("text the news for me", "how tall is mount everest", "order sushi", "set an alarm for 7am"):
+        assert route_query(query) is None
+        assert model.plan_for(query) is None, query
+
+
+def test_confident_prediction_returns_a_plan():
+    steps = _model().plan_for("what is due this week", threshold=0.5)
+    assert [(s["agent"], s["intent"]) for s in steps] == [("deadline_guardian_agent", "deadline.monitor")]
+
+
+def test_low_confidence_and_out_of_scope_defer_to_the_llm():
+    model = _model()
+    assert model.plan_for("what is due this week", threshold=1.0) is None
+    assert model.plan_for("tell me a joke", threshold=0.5) is None
+    assert model.stats()["predictions"] == 2 and model.stats()["confident"] == 0
+
+
+def test_model_file_round_trips(tmp_path, monkeypatch):
+    monkeypatch.setattr(intent_classifier, "_CLASSIFIER", None)  # restored after the load below
+    path = str(tmp_path / "intent.npz")
+    model = _model()
+    model.fingerprint = registry_fingerprint(load_registry())
+    model.llm_examples = intent_classifier.INTENT_MIN_LLM_EXAMPLES
+    model.save(path)
+
+    loaded = load_intent_classifier(load_registry(), path)
+    assert loaded.labels == model.labels
+    assert loaded.llm_examples == model.llm_examples
+    assert loaded.predict("how much money is left") == model.predict("how much money is left")
+
+
+def test_model_without_enough_llm_examples_is_not_served(tmp_path, monkeypatch):
+    monkeypatch.setattr(intent_classifier, "_CLASSIFIER", None)  # restored after the load below
+    path = str(tmp_path / "intent.npz")
+    model = _model()
+    model.llm_examples = 5
+    model.save(path)
+
+    assert load_intent_classifier(load_registry(), path, min_llm_examples=200) is None
+    assert intent_classifier.get_intent_classifier() is None
+    assert load_intent_classifier(load_registry(), path, min_llm_examples=5) is not None
+
+
+def test_training_records_llm_planned_examples(tmp_path, monkeypatch):
+    log = tmp_path / "decisions.jsonl"
+    steps = [{"step_id": 0, "agent": "deadline_guardian_agent", "intent": "deadline.monitor", "input_source": "user_query"}]
+    with open(log, "w") as fh:
+        for query, tier, entry_steps in [
+            ("anything due soon for me", None, steps),
+            ("which tasks are due tomorrow", None, steps),
+            ("list my deadlines", "deadlines", steps),
+        ]:
+            fh.write(json.dumps({"query": query, "tier": tier, "steps": entry_steps}) + "\n")
+    out = tmp_path / "intent.npz"
+    monkeypatch.setattr(intent_classifier, "seed_examples", lambda: EXAMPLES)
+
+    assert intent_classifier.main(["train", "--log", str(log), "--out", str(out), "--dim", "512", "--epochs", "50", "--holdout", "0"]) == 0
+    assert IntentClassifier.load(str(out)).llm_examples == 2
+
+
+def test_planner_uses_classifier_before_llm(monkeypatch):
+    model = _model()
+    monkeypatch.setattr(planner, "get_intent_classifier", lambda: model)
+    monkeypatch.setattr(planner, "get_openrouter_client", lambda: None)
+    monkeypatch.setattr(model, "plan_for", lambda query: IntentClassifier.plan_for(model, query, threshold=0.5))
+    registry = load_registry()
+
+    assert route_query("anything due soon for me") is None
+    planned = asyncio.run(planner.plan_tools_with_llm("anything due soon for me", registry))
+    assert planned.rule == "classifier"
+    assert [(s.agent, s.intent) for s in planned.steps] == [("deadline_guardian_agent", "deadline.monitor")]
+
+    deferred = asyncio.run(planner.plan_tools_with_llm("write a poem about the sea", registry))
+    assert deferred.rule == "no_llm" and deferred.steps == []
+
+
+def test_decision_log_is_off_by_default(tmp_path, monkeypatch):
+    path = tmp_path / "decisions.jsonl"
+    monkeypatch.setattr(intent_classifier, "PLANNER_LOG_PATH", str(path))
+    asyncio.run(intent_classifier.log_planner_decision("list my deadlines", Plan(steps=[])))
+    assert not path.exists()
+
+
+def test_decision_log_truncates_queries_and_rotates(tmp_path, monkeypatch):
+    path = tmp_path / "decisions.jsonl"
+    monkeypatch.setattr(intent_classifier, "PLANNER_LOG_ENABLED", True)
+    monkeypatch.setattr(intent_classifier, "PLANNER_LOG_PATH", str(path))
+    asyncio.run(intent_classifier.log_planner_decision("summarize: " + "x" * 10_000, Plan(steps=[])))
+    entry = json.loads(path.read_text())
+    assert len(entry["query"]) == intent_classifier.PLANNER_LOG_MAX_QUERY_CHARS
+
+    for _ in range(20):
+        write_decision(decision_entry("list my deadlines", Plan(steps=[])), str(path), max_bytes=1000)
+    assert path.stat().st_size <= 1000
+    assert (tmp_path / "decisions.jsonl.1").exists()
+    assert len(intent_classifier.logged_examples(str(path))) > 0
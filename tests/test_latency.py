@@ -0,0 +1,108 @@
+import asyncio
+from types import SimpleNamespace
+
+import httpx
+
+from app import agent_caller
+from app.circuit_breaker import CLOSED, get_breaker
+from app.latency import LATENCY_MIN_SAMPLES, LatencyTracker
+from app.models import AgentMetadata
+
+
+def _agent(name: str, timeout_ms: int = 30000) -> AgentMetadata:
+    return AgentMetadata(
+        name=name,
+        description="test agent",
+        intents=["slow.read"],
+        type="http",
+        endpoint="http://agent.test/handle",
+        timeout_ms=timeout_ms,
+    )
+
+
+def _warm_up(tracker: LatencyTracker, meta: AgentMetadata, elapsed_ms: float) -> None:
+    for _ in range(LATENCY_MIN_SAMPLES):
+        tracker.record(meta.name, "slow.read", elapsed_ms, cold=False)
+
+
+def test_effective_timeout_follows_rising_latency():
+    tracker = LatencyTracker()
+    meta = _agent("latency_rising_agent")
+    _warm_up(tracker, meta, 100)
+    stale = tracker.effective_timeout_ms(meta, "slow.read", cold=False)
+    assert stale == 2000  # p99 x 3 = 300 ms, raised to the floor
+
+    # Latency jumps to 3 s: the first call is cut off at the stale timeout...
+    tracker.record_timeout(meta.name, "slow.read", stale, cold=False)
+    widened = tracker.effective_timeout_ms(meta, "slow.read", cold=False)
+    assert widened > 3000
+
+    # ...the next one completes and the window keeps the new latency.
+    for _ in range(10):
+        tracker.record(meta.name, "slow.read", 3000, cold=False)
+    settled = tracker.effective_timeout_ms(meta, "slow.read", cold=False)
+    assert settled == 9000
+    assert tracker.snapshot(meta)["intents"]["slow.read"]["timeout_streak"] == 0
+
+
+def test_timeout_backoff_is_capped_by_registry_timeout():
+    tracker = LatencyTracker()
+    meta = _agent("latency_capped_agent", timeout_ms=5000)
+    _warm_up(tracker, meta, 100)
+    for _ in range(5):
+        tracker.record_timeout(meta.name, "slow.read", tracker.effective_timeout_ms(meta, "slow.read", cold=False), cold=False)
+    assert tracker.effective_timeout_ms(meta, "slow.read", cold=False) == 5000
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def perf_counter(self) -> float:
+        return self.now
+
+
+class _SlowClient:
+    """Answers after `latency_ms` of simulated time, or times out first."""
+
+    def __init__(self, clock: _Clock, latency_ms: float) -> None:
+        self.clock = clock
+        self.latency_ms = latency_ms
+        self.timeouts = 0
+
+    async def post(self, url, content, headers, timeout):
+        if self.latency_ms > timeout * 1000:
+            self.clock.now += timeout
+            self.timeouts += 1
+            raise httpx.ReadTimeout("timed out")
+        self.clock.now += self.latency_ms / 1000
+        body = b'{"request_id":"r","agent_name":"latency_http_agent","status":"success","output":{"result":"ok"}}'
+        return SimpleNamespace(status_code=200, content=body)
+
+
+def test_slow_agent_recovers_without_tripping_breaker(monkeypatch):
+    meta = _agent("latency_http_agent")
+    tracker = LatencyTracker()
+    clock = _Clock()
+    client = _SlowClient(clock, latency_ms=100)
+
+    async def client_for(agent_meta, url):
+        return client
+
+    monkeypatch.setattr(agent_caller, "get_latency_tracker", lambda: tracker)
+    monkeypatch.setattr(agent_caller, "_client_for", client_for)
+    monkeypatch.setattr(agent_caller, "time", clock)
+
+    async def run():
+        for _ in range(LATENCY_MIN_SAMPLES + 1):
+            await agent_caller.call_agent(meta, "slow.read", "hi", {})
+        client.latency_ms = 3000
+        return [await agent_caller.call_agent(meta, "slow.read", "hi", {}) for _ in range(5)]
+
+    responses = asyncio.run(run())
+
+    assert client.timeouts == 1
+    assert [r.status for r in responses] == ["error"] + ["success"] * 4
+    assert responses[0].error.type == "network_error"
+    assert get_breaker(meta).state == CLOSED
+    assert tracker.effective_timeout_ms(meta, "slow.read", cold=False) == 9000
@@ -0,0 +1,20 @@
+from app.models import AgentResponse, OutputModel
+from app.registry import find_agent_by_name, load_registry
+from app.response_cache import ResponseCache, cache_key
+from app.routing import route_query
+
+
+def test_routed_budget_writes_invalidate_cached_budget_reads():
+    budget = find_agent_by_name("budget_tracker_agent", load_registry())
+    cache = ResponseCache()
+    for intent, ttl_s in budget.cache_ttl_s.items():
+        response = AgentResponse(request_id="r", agent_name=budget.name, status="success", output=OutputModel(result=intent))
+        cache.put(cache_key(budget.name, intent, "show budgets", "u1"), response, ttl_s)
+
+    plan = route_query("add expense of $50 to the marketing budget")
+    assert [(step.agent, step.intent) for step in plan.steps] == [(budget.name, "budget.question")]
+
+    cache.invalidate_for_write(budget, plan.steps[0].intent)
+
+    for intent in budget.cache_ttl_s:
+        assert cache.get(cache_key(budget.name, intent, "show budgets", "u1"), "r2") is None
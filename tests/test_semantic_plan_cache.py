@@ -0,0 +1,153 @@
+import asyncio
+import json
+
+import numpy as np
+
+from app.models import AgentMetadata, Plan, PlanStep
+from app.semantic_plan_cache import SemanticPlanCache
+
+
+def _registry(*intents: str):
+    return [AgentMetadata(name="deadline_agent", description="test", intents=list(intents or ["deadline.list"]), type="http")]
+
+
+def _plan(intent: str = "deadline.list") -> Plan:
+    return Plan(steps=[PlanStep(step_id=0, agent="deadline_agent", intent=intent, input_source="user_query")])
+
+
+def _cache(tmp_path, **kwargs) -> SemanticPlanCache:
+    return SemanticPlanCache(path=str(tmp_path / "semantic.npz"), **kwargs)
+
+
+def test_paraphrase_hits_and_unrelated_query_misses(tmp_path):
+    cache = _cache(tmp_path, threshold=0.6)
+    registry = _registry()
+    cache.put("what are my upcoming deadlines", registry, _plan())
+
+    hit = cache.get("what are my upcoming deadlines this week", registry)
+    assert hit is not None
+    steps, similarity = hit
+    assert steps[0]["intent"] == "deadline.list" and 0.6 <= similarity < 1.0
+
+    assert cache.get("translate this paragraph into french", registry) is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_threshold_controls_reuse(tmp_path):
+    registry = _registry()
+    strict = _cache(tmp_path, threshold=0.99)
+    strict.put("what are my upcoming deadlines", registry, _plan())
+    assert strict.get("what are my upcoming deadlines this week", registry) is None
+    assert strict.get("What are my  upcoming DEADLINES", registry) is not None
+
+
+def test_least_recently_used_entry_is_evicted(tmp_path):
+    cache = _cache(tmp_path, threshold=0.95, max_entries=2)
+    registry = _registry()
+    cache.put("list my deadlines", registry, _plan())
+    cache.put("summarize the quarterly report", registry, _plan())
+    assert cache.get("list my deadlines", registry) is not None  # refresh the first entry
+    cache.put("schedule a meeting with marketing", registry, _plan())
+
+    assert cache.stats()["entries"] == 2 and cache.stats()["evictions"] == 1
+    assert cache.get("list my deadlines", registry) is not None
+    assert cache.get("summarize the quarterly report", registry) is None
+
+
+def test_registry_change_invalidates_entries(tmp_path):
+    cache = _cache(tmp_path, threshold=0.95)
+    cache.put("list my deadlines", _registry("deadline.list"), _plan())
+
+    assert cache.get("list my deadlines", _registry("deadline.list", "deadline.add")) is None
+    assert cache.stats()["invalidations"] == 1 and cache.stats()["entries"] == 0
+
+
+def test_persisted_index_round_trips_without_raw_queries(tmp_path):
+    registry = _registry()
+    cache = _cache(tmp_path, threshold=0.95)
+    cache.put("list my deadlines for alice@example.com", registry, _plan())
+    cache.save()
+
+    with np.load(tmp_path / "semantic.npz", allow_pickle=False) as data:
+        meta = json.loads(str(data["meta"]))
+    assert "alice" not in json.dumps(meta)
+
+    reloaded = _cache(tmp_path, threshold=0.95)
+    reloaded.load(registry)
+    assert reloaded.get("list my deadlines for alice@example.com", registry) is not None
+
+    stale = _cache(tmp_path, threshold=0.95)
+    stale.load(_registry("deadline.list", "deadline.add"))
+    assert stale.stats()["entries"] == 0
+
+
+def test_put_does_not_write_to_disk(tmp_path):
+    cache = _cache(tmp_path, threshold=0.95)
+    registry = _registry()
+    for i in range(50):
+        cache.put(f"query number {i} about deadlines", registry, _plan())
+    assert not (tmp_path / "semantic.npz").exists()
+
+
+def _onboarding_registry():
+    return [
+        AgentMetadata(
+            name="onboarding_buddy_agent",
+            description="test",
+            intents=["onboarding.create", "onboarding.check_progress"],
+            type="http",
+            write_intents=["onboarding.create"],
+        )
+    ]
+
+
+def _onboarding_plan(intent: str) -> Plan:
+    return Plan(steps=[PlanStep(step_id=0, agent="onboarding_buddy_agent", intent=intent, input_source="user_query")])
+
+
+def test_write_plans_are_never_indexed(tmp_path):
+    cache = _cache(tmp_path, threshold=0.5)
+    registry = _onboarding_registry()
+    cache.put("please set up the account for john smith", registry, _onboarding_plan("onboarding.create"))
+    assert cache.stats()["entries"] == 0
+    assert cache.get("please set up the account for john smith", registry) is None
+
+
+def test_leading_verb_must_match(tmp_path):
+    cache = _cache(tmp_path, threshold=0.5)
+    registry = _onboarding_registry()
+    tail = "the onboarding account for john smith in the engineering department starting monday"
+    cache.put(f"please show me {tail}", registry, _onboarding_plan("onboarding.check_progress"))
+
+    assert cache.get(f"can you show {tail}", registry) is not None
+    assert cache.get(f"please delete {tail}", registry) is None
+
+
+def test_near_miss_query_does_not_replay_a_create(tmp_path, monkeypatch):
+    from types import SimpleNamespace
+
+    from app import planner
+
+    calls = []
+
+    class _Completions:
+        async def create(self, **kwargs):
+            calls.append(kwargs)
+            content = json.dumps({"steps": [
+                {"step_id": 0, "agent": "onboarding_buddy_agent", "intent": "onboarding.create", "input_source": "user_query"}
+            ]})
+            return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+    client = SimpleNamespace(chat=SimpleNamespace(completions=_Completions()))
+    cache = _cache(tmp_path, threshold=0.9)
+    monkeypatch.setattr(planner, "get_openrouter_client", lambda: client)
+    monkeypatch.setattr(planner, "get_semantic_plan_cache", lambda: cache)
+    monkeypatch.setattr(planner, "get_intent_classifier", lambda: None)
+    registry = _onboarding_registry()
+    tail = "the account for zed quimby who joins the platform team on the first of next month"
+
+    asyncio.run(planner.plan_tools_with_llm(f"please set up {tail}", registry))
+    second = asyncio.run(planner.plan_tools_with_llm(f"please show me {tail}", registry))
+
+    assert second.rule is None
+    assert len(calls) == 2
@@ -0,0 +1,106 @@
+import asyncio
+
+from app import agent_caller
+from app.agent_caller import deadline_exceeded_response
+from app.models import AgentMetadata, AgentResponse, OutputModel
+from app.single_flight import SingleFlight
+
+
+def _ok(request_id: str, result: str) -> AgentResponse:
+    return AgentResponse(request_id=request_id, agent_name="a", status="success", output=OutputModel(result=result))
+
+
+def test_follower_retries_on_its_own_budget_after_leader_deadline():
+    flights = SingleFlight()
+
+    async def leader_call():
+        await asyncio.sleep(0.01)
+        return deadline_exceeded_response("leader", "a")
+
+    async def follower_call():
+        await asyncio.sleep(0.01)
+        return _ok("follower", "fresh")
+
+    async def run():
+        leader = asyncio.ensure_future(flights.do("k", leader_call, "r1"))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flights.do("k", follower_call, "r2"))
+        return await leader, await follower
+
+    leader, follower = asyncio.run(run())
+
+    assert leader.error.type == "deadline_exceeded"
+    assert follower.status == "success" and follower.output.result == "fresh"
+    assert follower.request_id == "r2"
+    assert flights.stats()["retried"] == 1
+
+
+def test_successful_result_is_shared():
+    flights = SingleFlight()
+    calls = []
+
+    async def call():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return _ok("x", "shared")
+
+    async def run():
+        return await asyncio.gather(*(flights.do("k", call, f"r{i}") for i in range(3)))
+
+    responses = asyncio.run(run())
+
+    assert len(calls) == 1
+    assert [r.request_id for r in responses] == ["r0", "r1", "r2"]
+    assert all(r.output.result == "shared" for r in responses)
+
+
+def test_follower_retries_when_shared_call_is_cancelled():
+    flights = SingleFlight()
+
+    async def cancelled_call():
+        await asyncio.sleep(0.01)
+        raise asyncio.CancelledError
+
+    async def own_call():
+        return _ok("x", "own")
+
+    async def run():
+        leader = asyncio.ensure_future(flights.do("k", cancelled_call, "r1"))
+        await asyncio.sleep(0)
+        follower = await flights.do("k", own_call, "r2")
+        leader_cancelled = False
+        try:
+            await leader
+        except asyncio.CancelledError:
+            leader_cancelled = True
+        return leader_cancelled, follower
+
+    leader_cancelled, follower = asyncio.run(run())
+
+    assert leader_cancelled
+    assert follower.output.result == "own"
+
+
+def test_calls_with_different_input_data_are_not_coalesced(monkeypatch):
+    meta = AgentMetadata(name="flight_data_agent", description="test", intents=["x.read"], type="http")
+    seen = []
+
+    async def invoke(agent_meta, intent, text, context, request_id, deadline=None, input_data=None):
+        seen.append(input_data)
+        await asyncio.sleep(0.01)
+        return _ok(request_id, str(input_data))
+
+    monkeypatch.setattr(agent_caller, "_invoke", invoke)
+
+    async def run():
+        return await asyncio.gather(
+            agent_caller.call_agent(meta, "x.read", "same", {}, input_data={"a": 1, "b": 2}),
+            agent_caller.call_agent(meta, "x.read", "same", {}, input_data={"b": 2, "a": 1}),
+            agent_caller.call_agent(meta, "x.read", "same", {}, input_data={"a": 2}),
+        )
+
+    first, same, other = asyncio.run(run())
+
+    assert len(seen) == 2
+    assert first.output.result == same.output.result
+    assert other.output.result == str({"a": 2})
@@ -0,0 +1,39 @@
+import asyncio
+
+from app import task_dependencies
+from app.models import AgentResponse, OutputModel
+from app.routing import route_query
+
+
+def _tda_response(result):
+    return AgentResponse(request_id="r", agent_name="task_dependency_agent", status="success", output=OutputModel(result=result))
+
+
+def test_routed_dependency_query_is_answered_with_task_names(monkeypatch):
+    fetches = []
+
+    async def fake_fetch_tasks(timeout_s=15):
+        fetches.append(timeout_s)
+        return [{"task_id": "1", "task_name": "Design schema"}, {"task_id": "2", "task_name": "Write API"}]
+
+    monkeypatch.setattr(task_dependencies, "fetch_tasks", fake_fetch_tasks)
+    plan = route_query("what is the dependency order of my tasks")
+    assert [step.agent for step in plan.steps] == ["task_dependency_agent"]
+
+    raw = {"execution_order": ["1", "2"], "dependencies": {"2": ["1"]}}
+    step_outputs = {0: _tda_response(raw), 1: _tda_response(dict(raw))}
+    asyncio.run(task_dependencies.describe_dependency_steps(step_outputs, timeout_s=5))
+
+    assert len(fetches) == 1
+    for resp in step_outputs.values():
+        assert resp.output.result == (
+            "Execution order tasks:\n- Design schema\n- Write API\nTasks with dependencies:\n- Write API"
+        )
+
+
+def test_dependency_names_are_skipped_without_budget(monkeypatch):
+    monkeypatch.setattr(task_dependencies, "httpx", object())
+    raw = {"execution_order": ["1"], "dependencies": {}}
+    step_outputs = {0: _tda_response(raw)}
+    asyncio.run(task_dependencies.describe_dependency_steps(step_outputs, timeout_s=0))
+    assert step_outputs[0].output.result == raw
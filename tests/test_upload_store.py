@@ -0,0 +1,112 @@
+import asyncio
+import base64
+
+from app import agent_caller
+from app.models import AgentMetadata, AgentResponse, OutputModel
+from app.upload_store import UploadStore
+
+
+def _b64(data: bytes) -> str:
+    return base64.b64encode(data).decode("ascii")
+
+
+def _agent(**kwargs) -> AgentMetadata:
+    return AgentMetadata(
+        name="file_ref_agent",
+        description="test agent",
+        intents=["doc.read"],
+        type="http",
+        endpoint="http://agent.test/handle",
+        accepts_files=True,
+        **kwargs,
+    )
+
+
+def test_pinned_uploads_survive_eviction_until_released():
+    store = UploadStore(max_bytes=10_000, max_entries=2)
+    mine = store.put(_b64(b"my resume"), "mine.pdf", "application/pdf", pin=True)
+    for i in range(5):
+        store.put(_b64(f"other upload {i}".encode()), f"other{i}.pdf", "application/pdf")
+
+    assert store.get(mine.digest) is not None
+
+    store.release([mine.digest])
+    store.put(_b64(b"one more"), "last.pdf", "application/pdf")
+    store.put(_b64(b"and another"), "final.pdf", "application/pdf")
+    assert store.get(mine.digest) is None
+
+
+def _capture_dispatch(monkeypatch, store):
+    handshakes = []
+
+    async def dispatch(agent_meta, handshake, text, timeout_ms, deadline_ms=None):
+        handshakes.append(handshake)
+        return AgentResponse(
+            request_id=handshake.request_id, agent_name=agent_meta.name, status="success", output=OutputModel(result="ok")
+        )
+
+    monkeypatch.setattr(agent_caller, "_dispatch", dispatch)
+    monkeypatch.setattr(agent_caller, "get_upload_store", lambda: store)
+    return handshakes
+
+
+def test_evicted_upload_is_an_error_step_not_a_bare_reference(monkeypatch):
+    store = UploadStore()
+    handshakes = _capture_dispatch(monkeypatch, store)
+    ref = {"digest": "sha256:" + "0" * 64, "filename": "gone.pdf", "mime_type": "application/pdf", "size": 3}
+
+    response = asyncio.run(agent_caller.call_agent(_agent(), "doc.read", "review", {"file_uploads": [ref]}))
+
+    assert response.status == "error"
+    assert response.error.type == "upload_missing"
+    assert handshakes == []
+
+
+def test_agent_with_file_refs_receives_bytes_once(monkeypatch):
+    store = UploadStore()
+    handshakes = _capture_dispatch(monkeypatch, store)
+    ref = store.put(_b64(b"resume bytes"), "cv.pdf", "application/pdf").ref()
+    meta = _agent(supports_file_refs=True)
+
+    async def run():
+        for _ in range(2):
+            await agent_caller.call_agent(meta, "doc.read", "review", {"file_uploads": [ref]})
+
+    asyncio.run(run())
+
+    first, second = (h.input["metadata"] for h in handshakes)
+    assert first["file_base64"] == _b64(b"resume bytes")
+    assert first["file_ref"]["digest"] == ref["digest"]
+    assert "file_base64" not in second
+    assert second["file_ref"]["digest"] == ref["digest"]
+
+
+def test_agent_without_file_refs_always_receives_bytes(monkeypatch):
+    store = UploadStore()
+    handshakes = _capture_dispatch(monkeypatch, store)
+    ref = store.put(_b64(b"resume bytes"), "cv.pdf", "application/pdf").ref()
+
+    async def run():
+        for _ in range(2):
+            await agent_caller.call_agent(_agent(), "doc.read", "review", {"file_uploads": [ref]})
+
+    asyncio.run(run())
+
+    assert all(h.input["metadata"]["file_base64"] == _b64(b"resume bytes") for h in handshakes)
+
+
+def test_non_fan_out_intent_receives_every_upload(monkeypatch):
+    store = UploadStore()
+    handshakes = _capture_dispatch(monkeypatch, store)
+    refs = [store.put(_b64(f"resume {i}".encode()), f"cv{i}.pdf", "application/pdf").ref() for i in range(3)]
+    meta = _agent(fan_out_intents=["doc.read"])
+    meta.intents.append("doc.rank")
+
+    response = asyncio.run(agent_caller.call_agent(meta, "doc.rank", "rank these", {"file_uploads": refs}))
+
+    assert response.status == "success"
+    metadata = handshakes[0].input["metadata"]
+    assert [f["filename"] for f in metadata["files"]] == ["cv0.pdf", "cv1.pdf", "cv2.pdf"]
+    assert [f["file_base64"] for f in metadata["files"]] == [_b64(f"resume {i}".encode()) for i in range(3)]
+    # Single-file workers keep reading the first upload from the flat fields.
+    assert metadata["filename"] == "cv0.pdf" and metadata["file_base64"] == _b64(b"resume 0")